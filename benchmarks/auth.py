@@ -0,0 +1,74 @@
+import json
+import time
+from typing import Literal
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from httpx import Response
+from jwt.algorithms import RSAAlgorithm
+
+from frost_shard.auth.models import AuthConfig
+
+CUSTOM_CLAIM = "https://frost-shard/claims"
+KEY_ID = "benchmark"
+
+
+def create_auth_config(
+    auth_domain: str = "auth.benchmark",
+    auth_scheme: Literal["https", "http"] = "https",
+) -> AuthConfig:
+    """Prepare the auth config trusting the fake identity provider."""
+    return AuthConfig(
+        auth_domain=auth_domain,
+        auth_scheme=auth_scheme,
+        audience="frost-shard",
+        algorithms=["RS256"],
+        custom_claim=CUSTOM_CLAIM,
+    )
+
+
+class FakeIdentityProvider:
+    """Identity provider minting the tokens and serving its JWKs.
+
+    Can be used in place of the HTTP service of the token service, so
+    the keys are fetched without any network calls.
+    """
+
+    def __init__(self, config: AuthConfig) -> None:
+        self.config = config
+        self.private_key = rsa.generate_private_key(
+            public_exponent=65537,
+            key_size=2048,
+        )
+
+    @property
+    def jwks(self) -> dict:
+        """Public keys in the JWKs format."""
+        public_key = RSAAlgorithm.to_jwk(self.private_key.public_key())
+        return {"keys": [{**json.loads(public_key), "kid": KEY_ID}]}
+
+    def mint_token(
+        self,
+        email: str,
+        permissions: list[str],
+        roles: list[str] = ["regular"],  # noqa: B006
+        expires_in: int = 3600,
+    ) -> str:
+        """Create a token signed by the provider."""
+        claims = {
+            "iss": self.config.base_auth_url,
+            "aud": self.config.audience,
+            "exp": int(time.time()) + expires_in,
+            "permissions": permissions,
+            CUSTOM_CLAIM: {"email": email, "roles": roles},
+        }
+        return jwt.encode(
+            claims,
+            self.private_key,
+            "RS256",
+            headers={"kid": KEY_ID},
+        )
+
+    async def request(self, method: str, url: str, **options) -> Response:
+        """Serve the JWKs as the auth API does."""
+        return Response(200, json=self.jwks)
@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any
+
+from fastapi import FastAPI
+from httpx import AsyncClient
+from pydantic import EmailStr
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from frost_shard.auth import dependencies as auth_dependencies
+from frost_shard.auth.enums import UserPermission, UserRole
+from frost_shard.auth.models import RequestUserModel
+from frost_shard.database.sql_repository import SQLRepository
+from frost_shard.settings import settings
+from frost_shard.v1.api import router as v1_router
+
+
+async def orm_create(self: SQLRepository, data: Any) -> Any:
+    """Create the entry through the unit of work, followed by a refresh.
+
+    That's how the repository used to create entries, kept as a baseline.
+    """
+    entry = self.table.from_orm(data)
+    self.session.add(entry)
+    await self.session.commit()
+    await self.session.refresh(entry)
+    return entry
+
+
+def create_application() -> FastAPI:
+    """Create the app with just the v1 API and a fixed user."""
+    app = FastAPI()
+    app.include_router(v1_router)
+    app.dependency_overrides[
+        auth_dependencies.get_request_user
+    ] = lambda: RequestUserModel(
+        email=EmailStr("benchmark@user.com"),
+        roles={UserRole.REGULAR},
+        permissions={UserPermission.CREATE_FILES},
+    )
+    return app
+
+
+async def measure(client: AsyncClient, requests: int) -> list[float]:
+    """Send the requests one by one and return their latencies in ms."""
+    latencies = []
+    for _ in range(requests):
+        started_at = time.perf_counter()
+        response = await client.post("/api/v1/files", json={})
+        latencies.append((time.perf_counter() - started_at) * 1000)
+        response.raise_for_status()
+    return latencies
+
+
+async def run(requests: int, warmup: int) -> None:
+    """Compare both ways of creating the files."""
+    engine = create_async_engine(settings.DATABASE_URL + settings.DATABASE_NAME)
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    returning_create = SQLRepository.create
+    async with AsyncClient(
+        app=create_application(),
+        base_url="http://benchmark",
+    ) as client:
+        for name, create in (
+            ("orm + refresh", orm_create),
+            ("insert returning", returning_create),
+        ):
+            SQLRepository.create = create  # type: ignore
+            await measure(client, warmup)
+            latencies = await measure(client, requests)
+            percentiles = statistics.quantiles(latencies, n=100)
+            print(
+                f"{name:<20} p50={percentiles[49]:.2f}ms "
+                f"p99={percentiles[98]:.2f}ms",
+            )
+    SQLRepository.create = returning_create  # type: ignore
+
+
+def main() -> None:
+    """Measure the latency of POST /files before and after INSERT ... RETURNING.
+
+    Needs the database from the settings, the files are left in there.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.warmup))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from frost_shard.database.models import FileSQLModel
+from frost_shard.domain.crypto_service import CryptoService
+from frost_shard.v1.dependencies import FILE_ROLLUPS
+
+SEED_QUERY = text(
+    """
+    INSERT INTO filesqlmodel (id, email, email_hash, date)
+    SELECT
+        gen_random_uuid(),
+        (CAST(:emails AS bytea[]))[n % :owners + 1],
+        (CAST(:hashes AS bytea[]))[n % :owners + 1],
+        DATE '2020-01-01' + n % 1000
+    FROM generate_series(0, CAST(:rows AS integer) - 1) AS n
+    """,
+)
+
+
+def get_owner_email(number: int) -> str:
+    """Return the email of one of the owners of the generated files."""
+    return f"owner{number}@benchmark.com"
+
+
+async def seed_files(
+    conn: AsyncConnection,
+    crypto: CryptoService,
+    rows: int,
+    owners: int,
+) -> None:
+    """Add 'rows' files spread evenly among 'owners' owners.
+
+    Files are generated by the database, so even millions of them are
+    added within seconds. Every owner has a single email ciphertext and
+    files are dated over 1000 days from 2020-01-01. Rollups are counted
+    anew once the files are in.
+    """
+    emails = [get_owner_email(number).encode() for number in range(owners)]
+    await conn.execute(
+        SEED_QUERY,
+        {
+            "emails": [crypto.encrypt(email) for email in emails],
+            "hashes": [crypto.digest(email) for email in emails],
+            "owners": owners,
+            "rows": rows,
+        },
+    )
+    for rollup in FILE_ROLLUPS:
+        for statement in rollup.rebuild(FileSQLModel):
+            await conn.execute(statement)
+    await conn.execute(text("ANALYZE"))
@@ -0,0 +1,64 @@
+import argparse
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks.auth import FakeIdentityProvider, create_auth_config
+
+
+def create_application(provider: FakeIdentityProvider) -> Starlette:
+    """Create the app serving the JWKs and minting the tokens."""
+
+    async def get_jwks(_: Request) -> JSONResponse:
+        return JSONResponse(provider.jwks)
+
+    async def create_token(request: Request) -> JSONResponse:
+        body = await request.json()
+        token = provider.mint_token(
+            body["email"],
+            body.get("permissions", []),
+            body.get("roles", ["regular"]),
+            body.get("expires_in", 3600),
+        )
+        return JSONResponse({"access_token": token, "token_type": "Bearer"})
+
+    return Starlette(
+        routes=[
+            Route("/.well-known/jwks.json", get_jwks),
+            Route("/token", create_token, methods=["POST"]),
+        ],
+    )
+
+
+def main() -> None:
+    """Run a local identity provider standing in for the auth API.
+
+    Serves its JWKs at '/.well-known/jwks.json' and mints the tokens at
+    'POST /token' for the JSON body with 'email', 'permissions' and
+    'roles'. The keys are generated on every start. Run the app with:
+
+    AUTH_DOMAIN=<host>:<port> AUTH_SCHEME=http AUDIENCE=frost-shard
+    ALGORITHMS='["RS256"]' CUSTOM_CLAIM=https://frost-shard/claims
+    """
+    parser = argparse.ArgumentParser(
+        description=main.__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+
+    config = create_auth_config(f"{args.host}:{args.port}", "http")
+    uvicorn.run(
+        create_application(FakeIdentityProvider(config)),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from httpx import AsyncClient, HTTPError, Limits
+
+from benchmarks.dataset import get_owner_email, seed_files
+from frost_shard.auth.enums import UserPermission
+from frost_shard.database.connection import get_engine
+from frost_shard.v1.dependencies import get_crypto_service
+
+OPERATIONS = ("create", "list")
+
+
+@dataclass
+class OperationStats:
+    """Outcome of all the requests of a single operation."""
+
+    latencies: list[float] = field(default_factory=list)
+    errors: Counter = field(default_factory=Counter)
+
+    def summarize(self) -> dict:
+        """Describe the latencies with the percentiles, in milliseconds."""
+        summary: dict = {
+            "requests": len(self.latencies),
+            "errors": dict(self.errors),
+        }
+        if len(self.latencies) > 1:
+            percentiles = statistics.quantiles(self.latencies, n=100)
+            summary.update(
+                p50=percentiles[49] * 1000,
+                p95=percentiles[94] * 1000,
+                p99=percentiles[98] * 1000,
+            )
+        return summary
+
+
+@dataclass(frozen=True)
+class User:
+    """User of the load test, with the token from the identity provider."""
+
+    email: str
+    token: str
+
+
+async def create_users(identity_provider_url: str, count: int) -> list[User]:
+    """Mint the tokens of the owners of the seeded files."""
+    users = []
+    async with AsyncClient(base_url=identity_provider_url) as client:
+        for number in range(count):
+            email = get_owner_email(number)
+            response = await client.post(
+                "/token",
+                json={
+                    "email": email,
+                    "permissions": [
+                        UserPermission.READ_FILES.value,
+                        UserPermission.CREATE_FILES.value,
+                    ],
+                },
+            )
+            response.raise_for_status()
+            users.append(User(email, response.json()["access_token"]))
+    return users
+
+
+async def send(
+    client: AsyncClient,
+    operation: str,
+    user: User,
+    scheduled_at: float,
+    stats: OperationStats,
+) -> None:
+    """Send the request of the operation and record its outcome.
+
+    Latency is counted from the time the request was scheduled, not sent,
+    so the time spent waiting for the client is not hidden.
+    """
+    headers = {"Authorization": f"Bearer {user.token}"}
+    try:
+        if operation == "create":
+            date = datetime.date(2020, 1, 1) + datetime.timedelta(
+                days=random.randrange(1000),  # noqa: S311
+            )
+            response = await client.post(
+                "/api/v1/files",
+                json={"date": date.isoformat()},
+                headers=headers,
+            )
+        else:
+            response = await client.get(
+                "/api/v1/files",
+                params={"email": user.email, "limit": 10},
+                headers=headers,
+            )
+    except HTTPError as error:
+        stats.errors[type(error).__name__] += 1
+        return
+
+    stats.latencies.append(time.perf_counter() - scheduled_at)
+    if response.is_error:
+        stats.errors[str(response.status_code)] += 1
+
+
+async def generate_load(
+    client: AsyncClient,
+    users: list[User],
+    mix: dict[str, int],
+    rps: float,
+    duration: float,
+    max_in_flight: int,
+) -> tuple[dict[str, OperationStats], float, int]:
+    """Send the requests at a steady rate, regardless of the responses.
+
+    Requests over the 'max_in_flight' limit are skipped and counted as
+    dropped, which means the client can't keep up with the target rate.
+
+    Returns:
+        tuple[dict[str, OperationStats], float, int]: Stats of every
+            operation, elapsed seconds and the number of dropped requests.
+    """
+    stats = {operation: OperationStats() for operation in mix}
+    in_flight: set[asyncio.Task] = set()
+    dropped = 0
+    started_at = time.perf_counter()
+
+    for number in range(int(rps * duration)):
+        scheduled_at = started_at + number / rps
+        await asyncio.sleep(max(scheduled_at - time.perf_counter(), 0))
+        if len(in_flight) >= max_in_flight:
+            dropped += 1
+            continue
+
+        operation = random.choices(  # noqa: S311
+            list(mix),
+            weights=list(mix.values()),
+        )[0]
+        task = asyncio.create_task(
+            send(
+                client,
+                operation,
+                random.choice(users),  # noqa: S311
+                scheduled_at,
+                stats[operation],
+            ),
+        )
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    await asyncio.gather(*in_flight)
+    return stats, time.perf_counter() - started_at, dropped
+
+
+def parse_mix(entries: list[str]) -> dict[str, int]:
+    """Parse the 'operation=weight' entries."""
+    mix = {}
+    for entry in entries:
+        operation, _, weight = entry.partition("=")
+        if operation not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation: {operation}")
+        mix[operation] = int(weight or 1)
+    return mix
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run the load test and summarize it."""
+    users = await create_users(args.identity_provider, args.users)
+    async with AsyncClient(
+        base_url=args.url,
+        limits=Limits(max_connections=args.max_in_flight),
+        timeout=args.timeout,
+    ) as client:
+        stats, elapsed, dropped = await generate_load(
+            client,
+            users,
+            parse_mix(args.mix),
+            args.rps,
+            args.duration,
+            args.max_in_flight,
+        )
+
+    completed = sum(len(entry.latencies) for entry in stats.values())
+    return {
+        "target_rps": args.rps,
+        "achieved_rps": completed / elapsed,
+        "dropped": dropped,
+        "operations": {
+            operation: entry.summarize() for operation, entry in stats.items()
+        },
+    }
+
+
+def print_report(report: dict) -> None:
+    """Print the load test summary in a human readable form."""
+    print(
+        f"target {report['target_rps']:.0f} rps, "
+        f"achieved {report['achieved_rps']:.1f} rps, "
+        f"dropped {report['dropped']}",
+    )
+    print(
+        f"{'operation':<10} {'requests':>9} {'errors':>7} "
+        f"{'p50':>9} {'p95':>9} {'p99':>9}",
+    )
+    for operation, summary in report["operations"].items():
+        percentiles = " ".join(
+            f"{summary.get(name, 0):>7.1f}ms" for name in ("p50", "p95", "p99")
+        )
+        print(
+            f"{operation:<10} {summary['requests']:>9} "
+            f"{sum(summary['errors'].values()):>7} {percentiles}",
+        )
+        for error, count in summary["errors"].items():
+            print(f"  {error}: {count}")
+
+
+async def seed(rows: int, owners: int) -> None:
+    """Add the files to the database of the app."""
+    engine = get_engine()
+    async with engine.begin() as conn:
+        await seed_files(conn, get_crypto_service(), rows, owners)
+    await engine.dispose()
+
+
+def main() -> None:
+    """Seed the files and load test the running app.
+
+    Start the app with the local identity provider from
+    'benchmarks.identity_provider' as the auth domain, and with the
+    'RATE_LIMIT' high enough not to throttle the load. 'seed' adds the
+    files to the app database, using the app settings, and 'run' sends
+    the requests of the owners of these files at the target rate.
+    """
+    parser = argparse.ArgumentParser(
+        description=main.__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="Add files to the app")
+    seed_parser.add_argument("--rows", type=int, default=100_000)
+    seed_parser.add_argument("--owners", type=int, default=100)
+
+    run_parser = commands.add_parser("run", help="Send the requests")
+    run_parser.add_argument("--url", default="http://127.0.0.1:8000/fs")
+    run_parser.add_argument(
+        "--identity-provider",
+        default="http://127.0.0.1:9000",
+    )
+    run_parser.add_argument("--users", type=int, default=100)
+    run_parser.add_argument(
+        "--mix",
+        nargs="+",
+        default=["create=1", "list=4"],
+        help="Weights of the operations, out of: create, list",
+    )
+    run_parser.add_argument("--rps", type=float, default=100)
+    run_parser.add_argument("--duration", type=float, default=30)
+    run_parser.add_argument("--max-in-flight", type=int, default=500)
+    run_parser.add_argument("--timeout", type=float, default=10)
+    run_parser.add_argument("--output", type=Path, help="Where to save report")
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        asyncio.run(seed(args.rows, args.owners))
+        return
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+    if any(summary["errors"] for summary in report["operations"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
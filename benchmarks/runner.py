@@ -0,0 +1,135 @@
+import inspect
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+Results = dict[str, dict[str, float]]
+
+
+async def measure(
+    operation: Callable[[], Any],
+    *,
+    number: int = 1,
+    repeats: int = 20,
+    warmup: int = 1,
+) -> list[float]:
+    """Time the operation, which may be a sync or an async function.
+
+    Every sample runs the operation 'number' times, so even the fastest
+    operations take long enough to be measured precisely.
+
+    Returns:
+        list[float]: Seconds per single operation for every sample.
+    """
+
+    async def run_sample() -> float:
+        started_at = time.perf_counter()
+        for _ in range(number):
+            result = operation()
+            if inspect.isawaitable(result):
+                await result
+        return (time.perf_counter() - started_at) / number
+
+    for _ in range(warmup):
+        await run_sample()
+    return [await run_sample() for _ in range(repeats)]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Describe the samples with the statistics stable enough to compare."""
+    median = statistics.median(samples)
+    p95 = (
+        statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else median
+    )
+    return {
+        "median": median,
+        "p95": p95,
+        "min": min(samples),
+        "ops_per_second": 1 / median if median else 0,
+        "samples": len(samples),
+    }
+
+
+def save_results(path: Path, results: Results) -> None:
+    """Store the results as JSON, together with the environment details."""
+    payload = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True))
+
+
+def load_results(path: Path) -> Results:
+    """Read the results stored with 'save_results'."""
+    return json.loads(path.read_text())["results"]
+
+
+def get_commit() -> str | None:
+    """Return the current git commit, if there is one."""
+    try:
+        return subprocess.run(  # noqa: S603, S607
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Results, baseline: Results, threshold: float) -> list[str]:
+    """Print the results next to the baseline and find the regressions.
+
+    Benchmark regresses if its median is slower than the baseline one by
+    more than the 'threshold' fraction.
+
+    Returns:
+        list[str]: Names of the regressed benchmarks.
+    """
+    regressions = []
+    print(f"{'benchmark':<45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, summary in sorted(results.items()):
+        current = format_duration(summary["median"])
+        if name not in baseline:
+            print(f"{name:<45} {'-':>12} {current:>12} {'new':>8}")
+            continue
+
+        change = summary["median"] / baseline[name]["median"] - 1
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = " !"
+        previous = format_duration(baseline[name]["median"])
+        print(
+            f"{name:<45} {previous:>12} {current:>12} {change:>+8.1%}{marker}"
+        )
+    return regressions
+
+
+def print_results(results: Results) -> None:
+    """Print the results in a human readable form."""
+    print(f"{'benchmark':<45} {'median':>12} {'p95':>12} {'ops/s':>12}")
+    for name, summary in sorted(results.items()):
+        print(
+            f"{name:<45} {format_duration(summary['median']):>12} "
+            f"{format_duration(summary['p95']):>12} "
+            f"{summary['ops_per_second']:>12,.0f}",
+        )
+
+
+def format_duration(seconds: float) -> str:
+    """Format the duration with the most readable unit."""
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.2f}us"
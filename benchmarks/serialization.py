@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import datetime
+import statistics
+import time
+from typing import Any, Callable
+
+from cryptography.fernet import Fernet
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from frost_shard.database.models import FileSQLModel
+from frost_shard.domain.crypto_service import CryptoService
+from frost_shard.domain.models import FileResponseModel
+from frost_shard.v1.responses import RowsJSONResponse
+
+
+def create_rows(count: int) -> list[FileSQLModel]:
+    """Create the rows the way the repository returns them."""
+    crypto = CryptoService(Fernet.generate_key().decode(), "benchmark")
+    email = b"benchmark@user.com"
+    start_date = datetime.date(2020, 1, 1)
+    return [
+        FileSQLModel(
+            email=crypto.encrypt(email),
+            email_hash=crypto.digest(email),
+            date=start_date + datetime.timedelta(days=number % 365),
+        )
+        for number in range(count)
+    ]
+
+
+async def pydantic_serialize(rows: list[FileSQLModel]) -> bytes:
+    """Serialize the rows the way FastAPI does with the response model."""
+    field = create_response_field(
+        name="benchmark",
+        type_=list[FileResponseModel],
+    )
+    content = await serialize_response(field=field, response_content=rows)
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+async def fast_serialize(rows: list[FileSQLModel]) -> bytes:
+    """Serialize the rows with the fast response."""
+    return RowsJSONResponse(rows, FileResponseModel).body
+
+
+async def measure(
+    serialize: Callable[[list[FileSQLModel]], Any],
+    rows: list[FileSQLModel],
+    repeats: int,
+) -> list[float]:
+    """Serialize the rows repeatedly and return the durations in ms."""
+    durations = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        await serialize(rows)
+        durations.append((time.perf_counter() - started_at) * 1000)
+    return durations
+
+
+async def run(rows_count: int, repeats: int) -> None:
+    """Compare both ways of serializing the rows."""
+    rows = create_rows(rows_count)
+    assert await pydantic_serialize(rows) == await fast_serialize(rows)
+
+    for name, serialize in (
+        ("pydantic + json", pydantic_serialize),
+        ("orjson rows", fast_serialize),
+    ):
+        durations = await measure(serialize, rows, repeats)
+        per_1k_rows = statistics.median(durations) * 1000 / rows_count
+        print(f"{name:<20} {per_1k_rows:.2f}ms per 1k rows")
+
+
+def main() -> None:
+    """Measure the serialization cost of the files listing per 1k rows.
+
+    Doesn't need the database, the rows are created in memory.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
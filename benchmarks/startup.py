@@ -0,0 +1,75 @@
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+
+from httpx import AsyncClient, HTTPError
+
+from frost_shard.settings import settings
+
+IMPORT_SCRIPT = (
+    "import time; start = time.perf_counter(); "
+    "import frost_shard.main; print(time.perf_counter() - start)"
+)
+
+
+def get_free_port() -> int:
+    """Find a port nothing listens on at the moment."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def measure_import() -> float:
+    """Time importing the app in a fresh interpreter, in seconds."""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        IMPORT_SCRIPT,
+        stdout=subprocess.PIPE,
+    )
+    stdout, _ = await process.communicate()
+    if process.returncode:
+        raise RuntimeError(f"Import failed with {process.returncode}")
+    # App logs go to the same output, the time is printed last
+    return float(stdout.decode().splitlines()[-1])
+
+
+async def measure_first_healthy_request(timeout: float = 30) -> float:
+    """Time from starting the server until it's healthy, in seconds.
+
+    Server only accepts the requests once the startup hooks are done,
+    so the warm-up is included.
+    """
+    port = get_free_port()
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "frost_shard.main:app",
+        f"--port={port}",
+        "--log-level=warning",
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        async with AsyncClient(
+            base_url=f"http://127.0.0.1:{port}{settings.API_PREFIX}",
+        ) as client:
+            while time.perf_counter() - start < timeout:
+                if process.returncode is not None:
+                    raise RuntimeError(
+                        f"Server exited with {process.returncode}",
+                    )
+                try:
+                    response = await client.get("/health")
+                except HTTPError:
+                    await asyncio.sleep(0.01)
+                    continue
+                if response.is_success:
+                    return time.perf_counter() - start
+        raise TimeoutError(f"Server not healthy after {timeout}s")
+    finally:
+        process.terminate()
+        await process.wait()
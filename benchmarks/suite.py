@@ -0,0 +1,398 @@
+import argparse
+import asyncio
+import datetime
+import logging
+import sys
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
+
+import structlog
+from cryptography.fernet import Fernet
+from fastapi import FastAPI
+from httpx import AsyncClient
+from pydantic import EmailStr
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.auth import FakeIdentityProvider, create_auth_config
+from benchmarks.dataset import get_owner_email, seed_files
+from benchmarks.runner import (
+    compare,
+    load_results,
+    measure,
+    print_results,
+    save_results,
+    summarize,
+)
+from benchmarks.serialization import (
+    create_rows,
+    fast_serialize,
+    pydantic_serialize,
+)
+from benchmarks.startup import measure_first_healthy_request, measure_import
+from frost_shard.auth import dependencies as auth_dependencies
+from frost_shard.auth.enums import UserPermission, UserRole
+from frost_shard.auth.models import RequestUserModel
+from frost_shard.auth.services import (
+    AuthRoutingService,
+    AuthService,
+    TokenService,
+)
+from frost_shard.bootstrap import add_exception_handlers
+from frost_shard.database import connection
+from frost_shard.database.models import FileSQLModel
+from frost_shard.domain.crypto_service import CryptoService
+from frost_shard.domain.file_service import FileService
+from frost_shard.domain.filters import FileFilters, PaginationParams
+from frost_shard.domain.repository import paginate
+from frost_shard.settings import settings
+from frost_shard.utils.cache import LRUCache
+from frost_shard.v1 import dependencies as v1_dependencies
+from frost_shard.v1.api import router as v1_router
+
+Samples = dict[str, list[float]]
+
+OWNERS = 100
+# Fixed index key, so the seeded files can be reused between the runs
+CRYPTO = CryptoService(Fernet.generate_key().decode(), "benchmark")
+
+
+def get_owner(number: int) -> RequestUserModel:
+    """Prepare the regular user owning a share of the files."""
+    return RequestUserModel(
+        email=EmailStr(get_owner_email(number)),
+        roles={UserRole.REGULAR},
+        permissions={UserPermission.READ_FILES},
+    )
+
+
+ADMIN = RequestUserModel(
+    email=EmailStr("admin@benchmark.com"),
+    roles={UserRole.ADMIN},
+    permissions={UserPermission.READ_FILES, UserPermission.READ_GLOBAL_FILES},
+)
+# Own files with the default parameters of the API
+SELF_FILTERS = FileFilters(email=None, date__gt=None, date__lt=None)
+# Files of someone else within a half year
+GLOBAL_FILTERS = FileFilters(
+    email=get_owner(1).email,
+    date__gt=datetime.date(2020, 3, 1),
+    date__lt=datetime.date(2020, 9, 1),
+)
+FIRST_PAGE = PaginationParams(page=0, limit=10, after=None)
+
+
+async def bench_crypto(args: argparse.Namespace) -> Samples:
+    """Time the single value operations of the crypto service."""
+    email = b"benchmark@user.com"
+    encrypted_email = CRYPTO.encrypt(email)
+    return {
+        "crypto.encrypt": await measure(
+            lambda: CRYPTO.encrypt(email),
+            number=1000,
+            repeats=args.repeats,
+        ),
+        "crypto.decrypt": await measure(
+            lambda: CRYPTO.decrypt(encrypted_email),
+            number=1000,
+            repeats=args.repeats,
+        ),
+        "crypto.digest": await measure(
+            lambda: CRYPTO.digest(email),
+            number=1000,
+            repeats=args.repeats,
+        ),
+    }
+
+
+async def bench_paginate(args: argparse.Namespace) -> Samples:
+    """Time the last page of generators, the worst case for 'paginate'."""
+    samples = {}
+    for size in (1_000, 100_000, 1_000_000):
+        samples[f"paginate.last_page[{size}]"] = await measure(
+            lambda size=size: list(
+                paginate(iter(range(size)), size // 10 - 1, 10)
+            ),
+            repeats=args.repeats,
+        )
+    return samples
+
+
+async def bench_serialization(args: argparse.Namespace) -> Samples:
+    """Time the serialization of a page of 1k files."""
+    rows = create_rows(1000)
+    return {
+        "serialization.pydantic[1000]": await measure(
+            lambda: pydantic_serialize(rows),
+            repeats=args.repeats,
+        ),
+        "serialization.orjson[1000]": await measure(
+            lambda: fast_serialize(rows),
+            repeats=args.repeats,
+        ),
+    }
+
+
+async def bench_auth(args: argparse.Namespace) -> Samples:
+    """Time the token verification, with and without the token cache."""
+    config = create_auth_config()
+    identity_provider = FakeIdentityProvider(config)
+    token_service = TokenService(config, identity_provider)  # type: ignore
+    auth_service = AuthService(
+        routing_service=AuthRoutingService(config),
+        token_service=token_service,
+        verified_tokens=LRUCache(max_size=1_000_000),
+    )
+    token = identity_provider.mint_token(
+        "benchmark@user.com",
+        [UserPermission.READ_FILES.value],
+    )
+    return {
+        "auth.decode_jwt_token": await measure(
+            lambda: token_service.decode_jwt_token(token),
+            number=100,
+            repeats=args.repeats,
+        ),
+        "auth.get_request_user[cached]": await measure(
+            lambda: auth_service.get_request_user(token),
+            number=1000,
+            repeats=args.repeats,
+        ),
+    }
+
+
+async def bench_startup(args: argparse.Namespace) -> Samples:
+    """Time the cold start of the app, each time in a new process.
+
+    Every autoscaled instance pays for it before serving the traffic.
+    """
+    repeats = range(args.startup_repeats)
+    return {
+        "startup.import": [await measure_import() for _ in repeats],
+        "startup.first_healthy_request": [
+            await measure_first_healthy_request() for _ in repeats
+        ],
+    }
+
+
+async def prepare_database(name: str) -> AsyncEngine:
+    """Create the benchmark database, unless it exists, with the tables."""
+    url = make_url(settings.DATABASE_URL + settings.DATABASE_NAME)
+    server = create_async_engine(
+        url.set(database="postgres"),
+        isolation_level="AUTOCOMMIT",
+    )
+    async with server.connect() as conn:
+        exists = await conn.scalar(
+            text("SELECT 1 FROM pg_database WHERE datname = :name"),
+            {"name": name},
+        )
+        if not exists:
+            await conn.execute(text(f'CREATE DATABASE "{name}"'))
+    await server.dispose()
+
+    engine = connection.create_engine(str(url.set(database=name)))
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    return engine
+
+
+async def seed(engine: AsyncEngine, rows: int) -> None:
+    """Fill the files table with exactly 'rows' files of 'OWNERS' owners.
+
+    Files are generated by the database and kept for the next runs.
+    """
+    async with engine.begin() as conn:
+        count = await conn.scalar(
+            select(func.count()).select_from(FileSQLModel),
+        )
+        if count == rows:
+            return
+
+        print(f"Seeding {rows} files...", file=sys.stderr)
+        tables = ", ".join(SQLModel.metadata.tables)
+        await conn.execute(text(f"TRUNCATE {tables}"))
+        await seed_files(conn, CRYPTO, rows, OWNERS)
+
+
+async def bench_collect(
+    args: argparse.Namespace,
+    engine: AsyncEngine,
+    rows: int,
+) -> Samples:
+    """Time the first page of own files and someone else's files."""
+    await seed(engine, rows)
+    async with connection.get_session_factory(engine)() as session:
+        file_service = FileService(
+            repository=v1_dependencies.create_file_repository(session),
+            crypto_service=CRYPTO,
+        )
+        return {
+            f"file_service.collect[self,{rows}]": await measure(
+                lambda: file_service.collect(
+                    get_owner(0),
+                    SELF_FILTERS,
+                    FIRST_PAGE,
+                ),
+                repeats=args.repeats,
+            ),
+            f"file_service.collect[global,{rows}]": await measure(
+                lambda: file_service.collect(
+                    ADMIN,
+                    GLOBAL_FILTERS,
+                    FIRST_PAGE,
+                ),
+                repeats=args.repeats,
+            ),
+        }
+
+
+def create_application(engine: AsyncEngine) -> FastAPI:
+    """Create the app with just the v1 API, the benchmark database and user.
+
+    Rate limiter is left out, since it would throttle the benchmark.
+    """
+    app = FastAPI()
+    add_exception_handlers(app)
+    app.include_router(v1_router)
+    session_factory = connection.get_session_factory(engine)
+
+    async def get_db_session() -> AsyncIterator[AsyncSession]:
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[connection.get_db_session] = get_db_session
+    app.dependency_overrides[
+        v1_dependencies.get_crypto_service
+    ] = lambda: CRYPTO
+    app.dependency_overrides[
+        auth_dependencies.get_request_user
+    ] = lambda: get_owner(0)
+    return app
+
+
+async def bench_asgi(args: argparse.Namespace, engine: AsyncEngine) -> Samples:
+    """Time the requests going through the whole app, on the last dataset."""
+    email = get_owner(0).email
+    async with AsyncClient(
+        app=create_application(engine),
+        base_url="http://benchmark",
+    ) as client:
+
+        async def get(url: str) -> None:
+            response = await client.get(url, params={"email": email})
+            response.raise_for_status()
+
+        return {
+            "asgi.get_files": await measure(
+                lambda: get("/api/v1/files"),
+                repeats=args.repeats,
+                number=10,
+            ),
+            "asgi.get_files_stats": await measure(
+                lambda: get("/api/v1/files/stats"),
+                repeats=args.repeats,
+                number=10,
+            ),
+        }
+
+
+async def run(args: argparse.Namespace) -> dict[str, list[float]]:
+    """Run the selected benchmark groups and collect their samples."""
+    groups: dict[str, Callable[[argparse.Namespace], Awaitable[Samples]]] = {
+        "crypto": bench_crypto,
+        "paginate": bench_paginate,
+        "serialization": bench_serialization,
+        "auth": bench_auth,
+        "startup": bench_startup,
+    }
+    samples: Samples = {}
+    for name, bench in groups.items():
+        if name in args.groups:
+            print(f"Running {name}...", file=sys.stderr)
+            samples.update(await bench(args))
+
+    if {"collect", "asgi"} & set(args.groups):
+        engine = await prepare_database(args.database)
+        if "collect" in args.groups:
+            for rows in args.rows:
+                print(f"Running collect on {rows} files...", file=sys.stderr)
+                samples.update(await bench_collect(args, engine, rows))
+        if "asgi" in args.groups:
+            await seed(engine, args.rows[-1])
+            print("Running asgi...", file=sys.stderr)
+            samples.update(await bench_asgi(args, engine))
+        await engine.dispose()
+    return samples
+
+
+def main() -> None:
+    """Measure the hot paths of the service and compare them to a baseline.
+
+    Database benchmarks use a database of their own on the server from
+    the settings, which is created and filled with the files if needed.
+    Exits with an error if any benchmark regressed against the baseline.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--groups",
+        nargs="+",
+        default=[
+            "crypto",
+            "paginate",
+            "serialization",
+            "auth",
+            "startup",
+            "collect",
+            "asgi",
+        ],
+    )
+    parser.add_argument(
+        "--rows",
+        nargs="+",
+        type=int,
+        default=[10_000, 100_000, 1_000_000],
+    )
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument(
+        "--startup-repeats",
+        type=int,
+        default=5,
+        help="Number of processes started by the startup benchmarks",
+    )
+    parser.add_argument("--database", default="frost-shard-benchmark")
+    parser.add_argument("--output", type=Path, help="Where to save results")
+    parser.add_argument("--baseline", type=Path, help="Results to compare to")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Slowdown fraction counted as a regression",
+    )
+    args = parser.parse_args()
+    # Logging every request would be measured as well
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING),
+    )
+
+    results = {
+        name: summarize(samples)
+        for name, samples in asyncio.run(run(args)).items()
+    }
+    if args.output is not None:
+        save_results(args.output, results)
+    if args.baseline is None:
+        print_results(results)
+        return
+
+    regressions = compare(results, load_results(args.baseline), args.threshold)
+    if regressions:
+        print(f"Regressed: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,13 @@
 from functools import lru_cache
 from typing import Callable, Iterable
 
-import jwt
 from fastapi import Depends, Request, security
-from structlog import get_logger
 
 from frost_shard.auth import enums, exceptions, models, services
 from frost_shard.settings import settings
+from frost_shard.utils.cache import LRUCache
 from frost_shard.utils.services import HttpService
 
-logger = get_logger(__name__)
-
 bearer = security.HTTPBearer()
 
 
@@ -42,6 +39,7 @@ def get_auth_service() -> services.AuthService:
     return services.AuthService(
         routing_service=routing_service,
         token_service=token_service,
+        verified_tokens=LRUCache(max_size=settings.TOKEN_CACHE_MAX_BYTES),
     )
 
 
@@ -50,29 +48,7 @@ async def get_request_user(
     auth_service: services.AuthService = Depends(get_auth_service),
 ) -> models.RequestUserModel:
     """Decode the jwt token and build a user object from it's payload."""
-    try:
-        decoded_token = await auth_service.decode_token(token.credentials)
-    except jwt.exceptions.PyJWTError:
-        raise exceptions.AuthenticationError("Invalid token (failed to decode)")
-
-    custom_claims = decoded_token[settings.CUSTOM_CLAIM]
-    email = custom_claims.get("email")
-    roles = custom_claims.get("roles")
-
-    if email is None or roles is None:
-        logger.error(
-            "Token is missing required fields",
-            decoded_token=decoded_token,
-        )
-        raise exceptions.AuthenticationError(
-            "Invalid token (missing required claims)",
-        )
-
-    return models.RequestUserModel(
-        email=email,
-        permissions=set(decoded_token.get("permissions", set())),
-        roles=set(roles),
-    )
+    return await auth_service.get_request_user(token.credentials)
 
 
 def has_permissions(
@@ -89,3 +65,19 @@ def has_permissions(
             raise exceptions.PermissionsError()
 
     return _has_permissions
+
+
+def has_roles(
+    roles: Iterable[enums.UserRole],
+) -> Callable[[models.RequestUserModel], None]:
+    """Prepare a function for checking given roles."""
+
+    def _has_roles(
+        user: models.RequestUserModel = Depends(get_request_user),
+    ) -> None:
+        """Check if user is having proper set of roles."""
+        required_roles = set(roles)
+        if not required_roles.issubset(user.roles):
+            raise exceptions.PermissionsError()
+
+    return _has_roles
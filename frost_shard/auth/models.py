@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, EmailStr, Field, HttpUrl
 
 from frost_shard.auth import enums
@@ -23,11 +25,13 @@ class AuthConfig(BaseModel):
 
     app_domain: str = settings.DOMAIN
     auth_domain: str = settings.AUTH_DOMAIN
+    auth_scheme: Literal["https", "http"] = settings.AUTH_SCHEME
     client_id: str = settings.CLIENT_ID
     client_secret: str = settings.CLIENT_SECRET
     audience: str = settings.AUDIENCE
     algorithms: list[str] = Field(default_factory=lambda: settings.ALGORITHMS)
     token_field_name: str = settings.TOKEN_FIELD_NAME
+    custom_claim: str = settings.CUSTOM_CLAIM
 
     @property
     def base_auth_url(self) -> HttpUrl:
@@ -36,7 +40,10 @@ class AuthConfig(BaseModel):
         Returns:
             HttpUrl: Base URL for the auth API.
         """
-        return HttpUrl(f"https://{self.auth_domain}/", scheme="https")
+        return HttpUrl(
+            f"{self.auth_scheme}://{self.auth_domain}/",
+            scheme=self.auth_scheme,
+        )
 
     @property
     def base_app_url(self) -> HttpUrl:
@@ -1,26 +1,51 @@
+import asyncio
+import contextlib
+import hashlib
+import time
 from datetime import datetime, timedelta
+from typing import NamedTuple
 from urllib.parse import urlencode, urljoin
 
 import jwt
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
 from fastapi import responses, status
 from jwt.algorithms import RSAAlgorithm
 from pydantic import HttpUrl
-
-from frost_shard.auth.models import AccessTokenCookie, AuthConfig
+from structlog import get_logger
+
+from frost_shard.auth import exceptions
+from frost_shard.auth.models import (
+    AccessTokenCookie,
+    AuthConfig,
+    RequestUserModel,
+)
+from frost_shard.metrics import JWKS_FETCH_SECONDS, TOKEN_VERIFY_SECONDS
+from frost_shard.utils.cache import LRUCache
 from frost_shard.utils.services import HttpService
 
+logger = get_logger(__name__)
+
 
 class TokenService:
     """Service class for handling JWT tokens."""
 
     JWK_REFRESH_RATE: int = 30
+    UNKNOWN_KID_COOLDOWN: int = 30
 
     def __init__(self, config: AuthConfig, http_service: HttpService) -> None:
         self.config = config
         self.http_service = http_service
 
         self.jwks: list[dict] = []
+        self.public_keys: dict[str, RSAPublicKey] = {}
         self.jwk_refresh_time = datetime.now()
+        # Bumped every time the fetched keys are different
+        self.jwks_version = 0
+
+        # Unknown key IDs fetch the keys again at most once per cooldown
+        self.unknown_kid_refresh_time = datetime.now()
+        self.refresh_task: asyncio.Task | None = None
+        self.refresher_task: asyncio.Task | None = None
 
     async def decode_jwt_token(self, token: str) -> dict:
         """Decode a JWT token.
@@ -35,13 +60,10 @@ class TokenService:
             dict: Decoded data from the token.
         """
         unverified_header = jwt.get_unverified_header(token)
-        await self._fetch_jwks()
-        jwk = self._get_jwk(unverified_header["kid"])
-        if jwk is None:
+        public_key = await self._get_public_key(unverified_header.get("kid"))
+        if public_key is None:
             raise jwt.InvalidTokenError()
 
-        public_key = RSAAlgorithm.from_jwk(jwk)
-
         return jwt.decode(
             token,
             public_key,  # type: ignore
@@ -74,34 +96,117 @@ class TokenService:
         )
         return response.json()["access_token"]
 
-    async def _fetch_jwks(self) -> None:
-        """Fetch the JWKs from the auth API.
+    async def refresh_jwks(self) -> None:
+        """Fetch the JWKs, or wait for the fetch already in progress.
 
-        To save some time, the keys are fetched once per 'JWK_REFRESH_RATE'.
+        All the concurrent callers share a single request to the auth API.
         """
-        if self.jwk_refresh_time <= datetime.now():
+        # Callers giving up should not cancel the fetch for the others
+        await asyncio.shield(self._start_refresh())
+
+    def start_jwks_refresher(self) -> None:
+        """Start refreshing the JWKs in the background."""
+        if self.refresher_task is None:
+            self.refresher_task = asyncio.create_task(self._refresh_jwks())
+
+    async def stop_jwks_refresher(self) -> None:
+        """Stop refreshing the JWKs in the background."""
+        if self.refresher_task is not None:
+            self.refresher_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.refresher_task
+            self.refresher_task = None
+
+    async def _refresh_jwks(self) -> None:
+        """Fetch the JWKs once per 'JWK_REFRESH_RATE', until cancelled."""
+        while True:
+            # Failures are already logged, just try again next time
+            with contextlib.suppress(Exception):
+                await self.refresh_jwks()
+            await asyncio.sleep(self.JWK_REFRESH_RATE)
+
+    def _start_refresh(self) -> asyncio.Task:
+        """Start fetching the JWKs, unless it's already in progress."""
+        if self.refresh_task is None or self.refresh_task.done():
+            self.refresh_task = asyncio.create_task(self._fetch_jwks())
+            self.refresh_task.add_done_callback(self._log_refresh_error)
+        return self.refresh_task
+
+    def _log_refresh_error(self, task: asyncio.Task) -> None:
+        """Log the error of the failed fetch, even if no one awaited it."""
+        if not task.cancelled() and (error := task.exception()):
+            logger.error("Failed to refresh the JWKs", error=repr(error))
+
+    async def _fetch_jwks(self) -> None:
+        """Fetch the JWKs from the auth API and parse the public keys."""
+        start = time.perf_counter()
+        try:
             response = await self.http_service.request(
                 "GET",
                 "/.well-known/jwks.json",
             )
-            self.jwks = response.json()["keys"]
-            self.jwk_refresh_time = datetime.now() + timedelta(
-                seconds=self.JWK_REFRESH_RATE,
+            jwks = response.json()["keys"]
+        except Exception:
+            JWKS_FETCH_SECONDS.labels("error").observe(
+                time.perf_counter() - start,
             )
+            raise
+        JWKS_FETCH_SECONDS.labels("success").observe(
+            time.perf_counter() - start,
+        )
+        if jwks != self.jwks:
+            self.public_keys = {
+                jwk["kid"]: RSAAlgorithm.from_jwk(jwk)  # type: ignore
+                for jwk in jwks
+                if jwk.get("kty") == "RSA"
+            }
+            self.jwks = jwks
+            self.jwks_version += 1
+        self.jwk_refresh_time = datetime.now() + timedelta(
+            seconds=self.JWK_REFRESH_RATE,
+        )
+
+    async def _get_public_key(self, kid: str | None) -> RSAPublicKey | None:
+        """Get the public key for a given key ID.
 
-    def _get_jwk(self, kid: str) -> dict | None:
-        """Get the JWK for a given key ID.
+        Keys are refreshed by the background refresher, so the request
+        only waits for the auth API when there are no keys yet, or when
+        the key ID is unknown. Unknown key IDs trigger a single fetch per
+        'UNKNOWN_KID_COOLDOWN' between all of them, so the random ones
+        can't flood the auth API. Within the cooldown they are rejected,
+        unless the keys are being fetched right now.
 
         Args:
-            kid (str): Key ID.
+            kid (str | None): Key ID.
 
         Returns:
-            dict | None: JWK for the key ID.
+            RSAPublicKey | None: Public key for the key ID.
         """
-        return next(
-            (key for key in self.jwks if key["kid"] == kid),
-            None,
-        )
+        if kid is None:
+            return None
+        if not self.public_keys:
+            await self.refresh_jwks()
+        elif self.refresher_task is None and (
+            self.jwk_refresh_time <= datetime.now()
+        ):
+            # Without the refresher, keep the keys fresh without waiting
+            self._start_refresh()
+
+        if (public_key := self.public_keys.get(kid)) is not None:
+            return public_key
+
+        now = datetime.now()
+        if self.unknown_kid_refresh_time <= now:
+            self.unknown_kid_refresh_time = now + timedelta(
+                seconds=self.UNKNOWN_KID_COOLDOWN,
+            )
+            await self.refresh_jwks()
+        elif self.refresh_task is not None and not self.refresh_task.done():
+            # Share the fetch in progress, it might bring the key
+            await self.refresh_jwks()
+        else:
+            return None
+        return self.public_keys.get(kid)
 
 
 class AuthRoutingService:
@@ -152,6 +257,13 @@ class AuthRoutingService:
         return HttpUrl(auth_logout_url, scheme="https")
 
 
+class VerifiedToken(NamedTuple):
+    """Claims of the verified token together with the user built from them."""
+
+    claims: dict
+    user: RequestUserModel
+
+
 class AuthService:
     """Orchestrator for all the auth operations."""
 
@@ -160,9 +272,14 @@ class AuthService:
         *,
         routing_service: AuthRoutingService,
         token_service: TokenService,
+        verified_tokens: LRUCache[bytes, VerifiedToken] | None = None,
     ) -> None:
         self.routing_service = routing_service
         self.token_service = token_service
+        if verified_tokens is None:
+            verified_tokens = LRUCache(max_size=0)
+        self.verified_tokens = verified_tokens
+        self.jwks_version = token_service.jwks_version
 
     def login(self) -> responses.RedirectResponse:
         """Prepare the redirect to the login page."""
@@ -195,4 +312,78 @@ class AuthService:
 
     async def decode_token(self, token: str) -> dict:
         """Decode a JWT token."""
-        return await self.token_service.decode_jwt_token(token)
+        verified_token = await self._verify_token(token)
+        return verified_token.claims
+
+    async def get_request_user(self, token: str) -> RequestUserModel:
+        """Decode a JWT token and build a user object from it's payload."""
+        verified_token = await self._verify_token(token)
+        return verified_token.user
+
+    async def _verify_token(self, token: str) -> VerifiedToken:
+        """Verify the token, unless it was already verified before.
+
+        Verified tokens are cached until they expire, or until the signing
+        keys change, so the signature of the same token is checked once.
+        The time is recorded for the cached, verified and rejected tokens.
+        """
+        start = time.perf_counter()
+        result = "rejected"
+        try:
+            self._drop_outdated_tokens()
+            key = hashlib.sha256(token.encode()).digest()
+            if (verified_token := self.verified_tokens.get(key)) is not None:
+                result = "cached"
+                return verified_token
+
+            try:
+                claims = await self.token_service.decode_jwt_token(token)
+            except jwt.exceptions.PyJWTError:
+                raise exceptions.AuthenticationError(
+                    "Invalid token (failed to decode)",
+                )
+            verified_token = VerifiedToken(claims, self._build_user(claims))
+            result = "verified"
+        finally:
+            TOKEN_VERIFY_SECONDS.labels(result).observe(
+                time.perf_counter() - start,
+            )
+
+        # Decoding might have fetched new keys in the meantime
+        self._drop_outdated_tokens()
+        if expires_at := claims.get("exp"):
+            self.verified_tokens.set(
+                key,
+                verified_token,
+                ttl=expires_at - time.time(),
+                # Rough estimate of the claims and the user together
+                size=2 * len(token),
+            )
+        return verified_token
+
+    def _drop_outdated_tokens(self) -> None:
+        """Drop all the verified tokens if the signing keys have changed."""
+        if self.token_service.jwks_version != self.jwks_version:
+            self.verified_tokens.clear()
+            self.jwks_version = self.token_service.jwks_version
+
+    def _build_user(self, claims: dict) -> RequestUserModel:
+        """Build a user object from the token claims."""
+        custom_claims = claims[self.routing_service.config.custom_claim]
+        email = custom_claims.get("email")
+        roles = custom_claims.get("roles")
+
+        if email is None or roles is None:
+            logger.error(
+                "Token is missing required fields",
+                decoded_token=claims,
+            )
+            raise exceptions.AuthenticationError(
+                "Invalid token (missing required claims)",
+            )
+
+        return RequestUserModel(
+            email=email,
+            permissions=set(claims.get("permissions", set())),
+            roles=set(roles),
+        )
@@ -1,10 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from ratelimit import RateLimitMiddleware, Rule, types
+from ratelimit.backends import BaseBackend
 from ratelimit.backends.simple import MemoryBackend
+from structlog import get_logger
 
 from frost_shard.handlers import EXCEPTION_HANDLERS
 from frost_shard.settings import settings
+from frost_shard.utils.rate_limit import SQLiteBackend
+
+logger = get_logger(__name__)
 
 
 def add_exception_handlers(app: FastAPI) -> None:
@@ -41,12 +46,19 @@ def add_rate_limiter(app: FastAPI) -> None:
         for header, value in scope["headers"]:
             if header == "authorization":
                 return value, "default"
-        return scope["client"], "default"
+        # Port changes with every connection, so only the host is used,
+        # the client is missing for some transports like unix sockets
+        client = scope.get("client")
+        return client[0] if client else "unknown", "default"
+
+    backend: BaseBackend = MemoryBackend()
+    if settings.RATE_LIMIT_STORAGE:
+        backend = SQLiteBackend(settings.RATE_LIMIT_STORAGE)
 
     app.add_middleware(
         RateLimitMiddleware,
         authenticate=auth_func,
-        backend=MemoryBackend(),
+        backend=backend,
         config={
             # User can access resources only once per 'RATE_LIMIT' seconds
             r"^/*": [  # noqa: WPS360
@@ -56,6 +68,30 @@ def add_rate_limiter(app: FastAPI) -> None:
     )
 
 
+def add_jwks_refresher(app: FastAPI) -> None:
+    """Keep the auth service JWKs fresh in the background."""
+    from frost_shard.auth.dependencies import get_auth_service
+
+    if settings.AUTH_SCHEME != "https":
+        # Keys fetched without TLS can be swapped on the way
+        logger.warning(
+            "Fetching the JWKs without TLS",
+            auth_scheme=settings.AUTH_SCHEME,
+            auth_domain=settings.AUTH_DOMAIN,
+        )
+    token_service = get_auth_service().token_service
+    app.add_event_handler("startup", token_service.start_jwks_refresher)
+    app.add_event_handler("shutdown", token_service.stop_jwks_refresher)
+
+
+def add_lifespan(app: FastAPI) -> None:
+    """Warm up the app on startup and release the connections on shutdown."""
+    from frost_shard.lifespan import shut_down, warm_up
+
+    app.add_event_handler("startup", warm_up)
+    app.add_event_handler("shutdown", shut_down)
+
+
 def init_sentry(app: FastAPI) -> None:  # pragma: no cover
     """Initialize Sentry middleware and add it to the app."""
     import sentry_sdk
@@ -82,6 +118,12 @@ def bootstrap(app: FastAPI) -> None:
     add_cors(app)
     add_rate_limiter(app)
 
+    if settings.AUTH_DOMAIN:  # pragma: no cover
+        add_jwks_refresher(app)
+    # Refresher goes first, so the warm-up joins its fetch of the JWKs
+    add_lifespan(app)
+
     if not settings.DEBUG:  # pragma: no cover
-        init_sentry(app)
+        if settings.SENTRY_DSN:
+            init_sentry(app)
         init_prometheus_metrics(app)
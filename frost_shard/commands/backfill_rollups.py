@@ -0,0 +1,28 @@
+import asyncio
+
+from frost_shard.database.connection import get_primary_session_factory
+from frost_shard.database.models import FileSQLModel
+from frost_shard.v1.dependencies import FILE_ROLLUPS
+
+
+async def backfill() -> None:
+    """Count all the files anew in every rollup table."""
+    async with get_primary_session_factory()() as session:
+        for rollup in FILE_ROLLUPS:
+            for statement in rollup.rebuild(FileSQLModel):
+                await session.execute(statement)
+        await session.commit()
+
+
+def main() -> None:
+    """Rebuild the file rollup tables from the files table.
+
+    Rollups are kept up to date on every write, so this is only needed
+    to fix them up, e.g. after files were written outside of the API.
+    File writes are blocked while it's running.
+    """
+    asyncio.run(backfill())
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,29 @@
+import asyncio
+from pathlib import Path
+
+from frost_shard.database.connection import get_primary_session_factory
+from frost_shard.database.rotation import KeyRotationWorker
+from frost_shard.settings import settings
+from frost_shard.v1.dependencies import get_crypto_service
+
+
+def main() -> None:
+    """Re-encrypt all the files with the current secret key.
+
+    Put the new key in 'SECRET_KEY' and move the old one to the front of
+    'PREVIOUS_SECRET_KEYS' before running it. Once it's done, the old key
+    is no longer needed to decrypt the files and can be removed. The blind
+    index only depends on 'BLIND_INDEX_KEY', which must never change.
+    """
+    worker = KeyRotationWorker(
+        get_primary_session_factory(),
+        get_crypto_service(),
+        batch_size=settings.KEY_ROTATION_BATCH_SIZE,
+        rows_per_second=settings.KEY_ROTATION_ROWS_PER_SECOND,
+        checkpoint=Path(settings.KEY_ROTATION_CHECKPOINT),
+    )
+    asyncio.run(worker.run())
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,155 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Generic, Sequence
+
+from structlog import get_logger
+
+from frost_shard.domain.repository import CreateModel, ReadModel, Repository
+
+logger = get_logger(__name__)
+
+CreateMany = Callable[[Sequence[CreateModel]], Awaitable[list[ReadModel]]]
+
+
+class WriteBatcher(Generic[ReadModel, CreateModel]):
+    """Coalesce concurrent single creates into batched ones.
+
+    Entries to create are collected for up to 'max_delay' seconds or until
+    there are 'max_size' of them, and then written all at once with a
+    single 'create_many' call. Every caller waits only for its own entry,
+    so the latency is bounded by the delay, while the database sees one
+    transaction per batch instead of one per entry.
+    """
+
+    def __init__(
+        self,
+        create_many: CreateMany,
+        *,
+        max_delay: float,
+        max_size: int,
+    ) -> None:
+        self.create_many = create_many
+        self.max_delay = max_delay
+        self.max_size = max_size
+
+        self.pending: list[tuple[CreateModel, asyncio.Future[ReadModel]]] = []
+        self.timer: asyncio.TimerHandle | None = None
+        self.flushes: set[asyncio.Task] = set()
+
+    async def create(self, data: CreateModel) -> ReadModel:
+        """Schedule the entry to be created and wait for it.
+
+        Args:
+            data (CreateModel): Data of the new entry.
+
+        Returns:
+            ReadModel: Created entry.
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[ReadModel] = loop.create_future()
+        self.pending.append((data, future))
+
+        if len(self.pending) >= self.max_size:
+            self._start_flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.max_delay, self._start_flush)
+        return await future
+
+    async def close(self) -> None:
+        """Write all the pending entries and wait for the running batches."""
+        self._start_flush()
+        await asyncio.gather(*self.flushes)
+
+    def _start_flush(self) -> None:
+        """Take the pending entries and write them in the background."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, []
+        task = asyncio.create_task(self._flush(batch))
+        # Keep the reference, so the task is not garbage collected
+        self.flushes.add(task)
+        task.add_done_callback(self.flushes.discard)
+
+    async def _flush(
+        self,
+        batch: list[tuple[CreateModel, asyncio.Future[ReadModel]]],
+    ) -> None:
+        """Write the batch and hand every caller its own entry."""
+        try:
+            entries = await self.create_many([data for data, _ in batch])
+        except Exception as exc:
+            logger.exception("Failed to write the batch", size=len(batch))
+            self._fail(batch, exc)
+            return
+
+        if len(entries) != len(batch):
+            # Entries can't be matched with the callers anymore
+            logger.error(
+                "Batch written with a different number of entries",
+                size=len(batch),
+                created=len(entries),
+            )
+            self._fail(
+                batch,
+                RuntimeError(
+                    f"Created {len(entries)} entries out of {len(batch)}",
+                ),
+            )
+            return
+
+        for (_, future), entry in zip(batch, entries):
+            # Callers might have stopped waiting in the meantime
+            if not future.done():
+                future.set_result(entry)
+
+    def _fail(
+        self,
+        batch: list[tuple[CreateModel, asyncio.Future[ReadModel]]],
+        exc: Exception,
+    ) -> None:
+        """Hand the error to every caller still waiting for the batch."""
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(exc)
+
+
+class BatchingRepository(Generic[ReadModel, CreateModel]):
+    """Repository sending single creates through the write batcher.
+
+    Everything else goes straight to the wrapped repository.
+    """
+
+    def __init__(
+        self,
+        repository: Repository[ReadModel, CreateModel],
+        batcher: WriteBatcher[ReadModel, CreateModel],
+    ) -> None:
+        self.repository = repository
+        self.batcher = batcher
+
+    async def create(self, data: CreateModel) -> ReadModel:
+        """Create a new entry together with the concurrent ones."""
+        return await self.batcher.create(data)
+
+    async def create_many(self, data: Sequence[CreateModel]) -> list[ReadModel]:
+        """Create new entries with the wrapped repository."""
+        return await self.repository.create_many(data)
+
+    async def collect(self, **options: Any) -> list[ReadModel]:
+        """Collect entries with the wrapped repository."""
+        return await self.repository.collect(**options)
+
+    def stream(self, **options: Any) -> AsyncIterator[ReadModel]:
+        """Iterate over entries with the wrapped repository."""
+        return self.repository.stream(**options)
+
+    async def count(self, **options: Any) -> list[tuple[Any, int]]:
+        """Count entries with the wrapped repository."""
+        return await self.repository.count(**options)
+
+    async def get_version(self, **options: Any) -> int | None:
+        """Get the version with the wrapped repository."""
+        return await self.repository.get_version(**options)
@@ -1,29 +1,136 @@
-from typing import AsyncGenerator, Callable, TypeAlias
+import asyncio
+import contextlib
+import itertools
+from functools import lru_cache
+from typing import AsyncGenerator, Callable, Iterator, TypeAlias
 
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from frost_shard.database.instrumentation import StatementObserver
+from frost_shard.database.pool import MeteredPool
+from frost_shard.metrics import observe_pool
 from frost_shard.settings import settings
 
 SessionGenerator: TypeAlias = AsyncGenerator[AsyncSession, None]
+ReplicaSessionGenerator: TypeAlias = AsyncGenerator[AsyncSession | None, None]
+SessionFactory: TypeAlias = Callable[..., AsyncSession]
 
 
-def get_session_factory(database_url: str) -> Callable[..., AsyncSession]:
-    """Return a session factory for the given database URL."""
+def create_engine(database_url: str) -> AsyncEngine:
+    """Create an async engine with the pool configured from the settings.
+
+    Statements are observed if either the metrics or the slow query log
+    are enabled.
+    """
+    engine = create_async_engine(
+        database_url,
+        poolclass=MeteredPool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+        connect_args={
+            "prepared_statement_cache_size": (
+                settings.DATABASE_STATEMENT_CACHE_SIZE
+            ),
+            "server_settings": {
+                "statement_timeout": str(settings.DATABASE_STATEMENT_TIMEOUT),
+            },
+        },
+    )
+    if settings.DATABASE_STATEMENT_METRICS or settings.DATABASE_SLOW_QUERY_MS:
+        StatementObserver(
+            slow_query_seconds=settings.DATABASE_SLOW_QUERY_MS / 1000,
+            explain=settings.DATABASE_SLOW_QUERY_EXPLAIN,
+        ).attach(engine)
+    return engine
+
+
+def get_session_factory(engine: AsyncEngine) -> SessionFactory:
+    """Return a session factory bound to the given engine."""
     return sessionmaker(
-        bind=create_async_engine(database_url),
+        bind=engine,
         class_=AsyncSession,  # type: ignore
         expire_on_commit=False,
     )
 
 
-session_factory = get_session_factory(
-    settings.DATABASE_URL + settings.DATABASE_NAME,
-)
+@lru_cache(maxsize=1)
+def get_engine() -> AsyncEngine:
+    """Create the engine of the primary database, once per process.
+
+    Nothing is connected until the pool is used, or prewarmed.
+    """
+    engine = create_engine(settings.DATABASE_URL + settings.DATABASE_NAME)
+    observe_pool(engine.sync_engine.pool)
+    return engine
+
+
+@lru_cache(maxsize=1)
+def get_replica_engines() -> tuple[AsyncEngine, ...]:
+    """Create the engines of the replicas, once per process."""
+    # Database name is shared with the primary, only the servers differ
+    return tuple(
+        create_engine(url + settings.DATABASE_NAME)
+        for url in settings.DATABASE_REPLICA_URLS
+    )
+
+
+@lru_cache(maxsize=1)
+def get_primary_session_factory() -> SessionFactory:
+    """Return the session factory of the primary database."""
+    return get_session_factory(get_engine())
+
+
+@lru_cache(maxsize=1)
+def get_replica_session_factories() -> Iterator[SessionFactory]:
+    """Return the session factories of the replicas, in turns."""
+    return itertools.cycle(
+        [get_session_factory(engine) for engine in get_replica_engines()],
+    )
+
+
+async def prewarm_pool(engine: AsyncEngine, connections: int) -> None:
+    """Open the connections up front, so requests don't wait for them.
+
+    At most the pool size is opened, since the overflow connections
+    would be closed right after being returned.
+    """
+    pool_size = engine.sync_engine.pool.size()  # type: ignore
+    connections = min(connections, pool_size)
+    async with contextlib.AsyncExitStack() as stack:
+        # Hold them all at once, so they are not the same connection
+        await asyncio.gather(
+            *(
+                stack.enter_async_context(engine.connect())
+                for _ in range(connections)
+            ),
+        )
+
+
+async def dispose_engines() -> None:
+    """Close the connections of the primary and the replicas."""
+    await asyncio.gather(
+        *(
+            engine.dispose()
+            for engine in (get_engine(), *get_replica_engines())
+        ),
+    )
 
 
 async def get_db_session() -> SessionGenerator:  # pragma: no cover
     """Return an async database session."""
-    async with session_factory() as session:
+    async with get_primary_session_factory()() as session:
+        yield session
+
+
+async def get_replica_db_session() -> ReplicaSessionGenerator:
+    """Return an async session of the next replica, if there are any."""
+    if not settings.DATABASE_REPLICA_URLS:
+        yield None
+        return
+    async with next(get_replica_session_factories())() as session:
         yield session
@@ -1,6 +1,7 @@
-from typing import Any
+from typing import Any, Sequence
 
-from sqlalchemy.sql.elements import BinaryExpression
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.sql.elements import BinaryExpression, ColumnElement
 from sqlmodel import SQLModel
 
 
@@ -52,3 +53,38 @@ def create_expressions(
     return [
         get_expression(model, field, value) for field, value in filters.items()
     ]
+
+
+def create_keyset_expression(
+    model: type[SQLModel],
+    fields: Sequence[str],
+    values: Sequence[Any],
+) -> ColumnElement:
+    """Create an expression matching entries placed after given values.
+
+    Compares the fields as a row, so with a matching index the database
+    can seek straight to the next page instead of skipping an offset.
+    The entries are expected in the ascending order with NULLs last, and
+    only the first field can be NULL, since a row with NULLs never
+    compares greater than another.
+
+    Args:
+        model (type[SQLModel]): Model to create the expression for.
+        fields (Sequence[str]): Field names in the ordering of the entries.
+        values (Sequence[Any]): Field values of the last seen entry.
+
+    Returns:
+        ColumnElement: SQLAlchemy boolean expression.
+    """
+    first_column = getattr(model, fields[0])
+    if values[0] is None:
+        # Only the other NULLs come after a NULL, ordered by the rest
+        return and_(
+            first_column.is_(None),
+            create_keyset_expression(model, fields[1:], values[1:]),
+        )
+    columns = [getattr(model, field) for field in fields]
+    expression = tuple_(*columns) > tuple_(*values)
+    if model.__table__.c[fields[0]].nullable:  # type: ignore
+        expression = or_(expression, first_column.is_(None))
+    return expression
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import re
+import time
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from structlog import get_logger
+
+from frost_shard.metrics import (
+    SLOW_STATEMENTS,
+    STATEMENT_ROWS,
+    STATEMENT_SECONDS,
+    STATEMENTS,
+)
+
+logger = get_logger(__name__)
+
+# Fingerprints seen after that many are all exported under one label
+MAX_FINGERPRINTS = 1000
+OTHER_FINGERPRINT = "other"
+
+NORMALIZE_PATTERNS = (
+    # String literals, placeholders and numbers
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|%s|\$\d+"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    # Lists of values, so their length doesn't make a new statement
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),
+    (re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+"), "(...)"),
+    (re.compile(r"\s+"), " "),
+)
+START_TIME_KEY = "_frost_shard_statement_start"
+# Plan fields naming the nodes, the numeric ones are all kept as well
+PLAN_LABELS = frozenset(
+    (
+        "Node Type",
+        "Parent Relationship",
+        "Relation Name",
+        "Index Name",
+        "Join Type",
+        "Strategy",
+        "Scan Direction",
+    ),
+)
+
+
+@lru_cache(maxsize=4096)
+def normalize_statement(statement: str) -> str:
+    """Strip the statement from all the values, leaving its shape.
+
+    Statements are compiled once and cached by SQLAlchemy, so the same
+    string comes back over and over and is normalized only once.
+    """
+    for pattern, replacement in NORMALIZE_PATTERNS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+def fingerprint_statement(normalized: str) -> str:
+    """Identify the normalized statement with a short, stable hash."""
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]  # noqa: S303
+
+
+def describe_parameters(parameters: Any, executemany: bool = False) -> Any:
+    """Describe the parameters by their types, never by their values.
+
+    Encrypted emails and blind indexes go through the parameters, so
+    only the shape is ever logged.
+    """
+    if executemany:
+        return {
+            "count": len(parameters),
+            "first": describe_parameters(parameters[0]) if parameters else None,
+        }
+    if isinstance(parameters, dict):
+        return {
+            name: type(value).__name__ for name, value in parameters.items()
+        }
+    return [type(value).__name__ for value in parameters or ()]
+
+
+def summarize_plan(node: dict) -> dict:
+    """Keep the node types, costs, rows, timings and buffers of the plan.
+
+    Conditions, filters and sort keys are dropped, since the values bound
+    to the statement show up there as literals.
+    """
+    summary: dict[str, Any] = {}
+    for key, value in node.items():
+        if key in {"Plan", "Planning"}:
+            summary[key] = summarize_plan(value)
+        elif key == "Plans":
+            summary[key] = [summarize_plan(child) for child in value]
+        elif key in PLAN_LABELS or isinstance(value, (int, float)):
+            summary[key] = value
+    return summary
+
+
+def count_rows(cursor: Any) -> int | None:
+    """Count the rows returned by the statement, if known up front."""
+    if cursor.description is None:
+        return cursor.rowcount if cursor.rowcount >= 0 else None
+    # The asyncpg adapter buffers the whole result, unless it's streamed
+    rows = getattr(cursor, "_rows", None)
+    return len(rows) if isinstance(rows, list) else None
+
+
+class StatementObserver:
+    """Engine listener recording the statements and logging slow ones.
+
+    Every statement is identified by the fingerprint of its shape, and
+    counted together with its time and rows returned per fingerprint.
+    Statements slower than 'slow_query_seconds' are logged, and if
+    'explain' is set, slow SELECTs are run again under EXPLAIN (ANALYZE,
+    BUFFERS) within a savepoint, so the summary of their plan is logged
+    as well.
+    """
+
+    def __init__(
+        self,
+        *,
+        slow_query_seconds: float = 0,
+        explain: bool = False,
+    ) -> None:
+        self.slow_query_seconds = slow_query_seconds
+        self.explain = explain
+        self.fingerprints: set[str] = set()
+
+    def attach(self, engine: AsyncEngine) -> None:
+        """Start observing the statements executed by the engine."""
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self.before_execute)
+        event.listen(sync_engine, "after_cursor_execute", self.after_execute)
+
+    def before_execute(
+        self,
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: ExecutionContext | None,
+        executemany: bool,
+    ) -> None:
+        """Remember when the statement started."""
+        if context is not None:
+            setattr(context, START_TIME_KEY, time.perf_counter())
+
+    def after_execute(
+        self,
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: ExecutionContext | None,
+        executemany: bool,
+    ) -> None:
+        """Record the finished statement and log it if it was slow."""
+        start = getattr(context, START_TIME_KEY, None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+
+        normalized = normalize_statement(statement)
+        fingerprint = self._get_label(normalized)
+        rows = count_rows(cursor)
+        STATEMENTS.labels(fingerprint).inc()
+        STATEMENT_SECONDS.labels(fingerprint).inc(duration)
+        if rows is not None:
+            STATEMENT_ROWS.labels(fingerprint).inc(rows)
+
+        if not self.slow_query_seconds or duration < self.slow_query_seconds:
+            return
+        SLOW_STATEMENTS.labels(fingerprint).inc()
+        plan = None
+        streamed = context.execution_options.get(  # type: ignore
+            "stream_results",
+        )
+        if self.explain and not executemany and not streamed:
+            plan = self._explain(conn, statement, parameters)
+        logger.warning(
+            "Slow database statement",
+            fingerprint=fingerprint,
+            statement=normalized,
+            duration_ms=round(duration * 1000, 3),
+            rows=rows,
+            parameters=describe_parameters(parameters, executemany),
+            plan=plan,
+        )
+
+    def _get_label(self, normalized: str) -> str:
+        """Get the fingerprint label, keeping the number of them bounded."""
+        fingerprint = fingerprint_statement(normalized)
+        if fingerprint in self.fingerprints:
+            return fingerprint
+        if len(self.fingerprints) >= MAX_FINGERPRINTS:
+            return OTHER_FINGERPRINT
+        self.fingerprints.add(fingerprint)
+        # Labels are only hashes, log once what they stand for
+        logger.info(
+            "New database statement",
+            fingerprint=fingerprint,
+            statement=normalized,
+        )
+        return fingerprint
+
+    def _explain(
+        self,
+        conn: Connection,
+        statement: str,
+        parameters: Any,
+    ) -> dict | None:
+        """Run the SELECT again to get the summary of its actual plan.
+
+        Anything else would be applied twice, so only SELECTs are run.
+        The savepoint keeps the transaction usable if the plan fails,
+        for example by hitting the statement timeout. Outside of the
+        transaction, like with autocommit, the savepoint itself fails,
+        and the plan is skipped.
+        """
+        if statement.lstrip()[:6].upper() != "SELECT":
+            return None
+        cursor = conn.connection.cursor()
+        in_savepoint = False
+        try:
+            cursor.execute("SAVEPOINT frost_shard_explain")
+            in_savepoint = True
+            cursor.execute(
+                f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}",
+                parameters,
+            )
+            plan = cursor.fetchone()[0]
+            cursor.execute("RELEASE SAVEPOINT frost_shard_explain")
+        except Exception as error:
+            if in_savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT frost_shard_explain")
+            logger.warning("Failed to explain", error=repr(error))
+            return None
+        finally:
+            cursor.close()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return summarize_plan(plan[0])
@@ -0,0 +1,80 @@
+"""add email hash
+
+Revision ID: 4c2e8a1d7b90
+Revises: 81f162ea94c3
+Create Date: 2026-10-18 09:12:41.318205
+
+"""
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+from frost_shard.domain.crypto_service import CryptoService
+from frost_shard.settings import settings
+
+# revision identifiers, used by Alembic.
+revision = "4c2e8a1d7b90"
+down_revision = "81f162ea94c3"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+files = sa.table(
+    "filesqlmodel",
+    sa.column("id", sqlmodel.sql.sqltypes.GUID()),
+    sa.column("email", sa.LargeBinary()),
+    sa.column("email_hash", sa.LargeBinary()),
+)
+
+
+def backfill_email_hash() -> None:
+    """Compute the blind index for all the existing files in batches."""
+    connection = op.get_bind()
+    crypto = CryptoService(
+        settings.SECRET_KEY,
+        settings.BLIND_INDEX_KEY,
+        previous_secrets=settings.PREVIOUS_SECRET_KEYS,
+    )
+    query = (
+        sa.select(files.c.id, files.c.email)
+        .where(files.c.email_hash.is_(None))
+        .order_by(files.c.id)
+        .limit(BATCH_SIZE)
+    )
+    statement = (
+        sa.update(files)
+        .where(files.c.id == sa.bindparam("_id"))
+        .values(email_hash=sa.bindparam("_email_hash"))
+    )
+    while rows := connection.execute(query).all():
+        connection.execute(
+            statement,
+            [
+                {
+                    "_id": row.id,
+                    "_email_hash": crypto.digest(crypto.decrypt(row.email)),
+                }
+                for row in rows
+            ],
+        )
+
+
+def upgrade() -> None:
+    op.add_column(
+        "filesqlmodel",
+        sa.Column("email_hash", sa.LargeBinary(), nullable=True),
+    )
+    backfill_email_hash()
+    op.alter_column("filesqlmodel", "email_hash", nullable=False)
+    op.create_index(
+        op.f("ix_filesqlmodel_email_hash"),
+        "filesqlmodel",
+        ["email_hash"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_filesqlmodel_email_hash"), table_name="filesqlmodel")
+    op.drop_column("filesqlmodel", "email_hash")
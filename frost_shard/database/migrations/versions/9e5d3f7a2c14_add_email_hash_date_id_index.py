@@ -0,0 +1,37 @@
+"""add email hash date id index
+
+Revision ID: 9e5d3f7a2c14
+Revises: 4c2e8a1d7b90
+Create Date: 2026-10-18 11:40:07.526913
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9e5d3f7a2c14"
+down_revision = "4c2e8a1d7b90"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_filesqlmodel_email_hash_date_id",
+        "filesqlmodel",
+        ["email_hash", "date", "id"],
+        unique=False,
+    )
+    op.drop_index("ix_filesqlmodel_email_hash", table_name="filesqlmodel")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_filesqlmodel_email_hash",
+        "filesqlmodel",
+        ["email_hash"],
+        unique=False,
+    )
+    op.drop_index(
+        "ix_filesqlmodel_email_hash_date_id",
+        table_name="filesqlmodel",
+    )
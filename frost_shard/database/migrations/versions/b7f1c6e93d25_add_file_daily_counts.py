@@ -0,0 +1,38 @@
+"""add file daily counts
+
+Revision ID: b7f1c6e93d25
+Revises: 9e5d3f7a2c14
+Create Date: 2026-10-18 14:05:52.184377
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7f1c6e93d25"
+down_revision = "9e5d3f7a2c14"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "filedailycountsqlmodel",
+        sa.Column("email_hash", sa.LargeBinary(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("email_hash", "date"),
+    )
+    op.execute(
+        """
+        INSERT INTO filedailycountsqlmodel (email_hash, date, count)
+        SELECT email_hash, date, count(*)
+        FROM filesqlmodel
+        WHERE date IS NOT NULL
+        GROUP BY email_hash, date
+        """,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("filedailycountsqlmodel")
@@ -0,0 +1,36 @@
+"""add file owner counts
+
+Revision ID: d3a9e4b1f608
+Revises: b7f1c6e93d25
+Create Date: 2026-10-18 15:21:09.730416
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d3a9e4b1f608"
+down_revision = "b7f1c6e93d25"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "fileownercountsqlmodel",
+        sa.Column("email_hash", sa.LargeBinary(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("email_hash"),
+    )
+    op.execute(
+        """
+        INSERT INTO fileownercountsqlmodel (email_hash, count)
+        SELECT email_hash, count(*)
+        FROM filesqlmodel
+        GROUP BY email_hash
+        """,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("fileownercountsqlmodel")
@@ -1,6 +1,7 @@
 import datetime
 import uuid
 
+from sqlalchemy import Index
 from sqlalchemy.ext.declarative import declared_attr
 from sqlmodel import Field, SQLModel
 
@@ -22,9 +23,36 @@ class BaseSQLModel(SQLModel):
         return self.__name__.lower()
 
 
+class RollupSQLModel(SQLModel):
+    """Base class for the rollup SQL models, counting entries per group."""
+
+    count: int = 0
+
+    def __init_subclass__(cls, *args, **kwargs) -> None:
+        """Satisfy mypy type checking."""
+
+
 class FileSQLModel(BaseSQLModel, table=True):
     """SQL model for the file table."""
 
     __name__ = "files"
+    # Covers filtering by owner and listing their files in keyset order
+    __table_args__ = (
+        Index("ix_filesqlmodel_email_hash_date_id", "email_hash", "date", "id"),
+    )
     email: bytes
+    email_hash: bytes
     date: datetime.date | None = Field(default_factory=datetime.date.today)
+
+
+class FileDailyCountSQLModel(RollupSQLModel, table=True):
+    """SQL model for the number of files per owner and day."""
+
+    email_hash: bytes = Field(primary_key=True)
+    date: datetime.date = Field(primary_key=True)
+
+
+class FileOwnerCountSQLModel(RollupSQLModel, table=True):
+    """SQL model for the number of files per owner."""
+
+    email_hash: bytes = Field(primary_key=True)
@@ -0,0 +1,18 @@
+import time
+from typing import Any
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from frost_shard.metrics import POOL_CHECKOUT_SECONDS
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long the checkouts take."""
+
+    def connect(self) -> Any:
+        """Check out a connection, waiting for a free one if needed."""
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
@@ -0,0 +1,98 @@
+import hashlib
+import hmac
+import time
+from typing import Any, AsyncIterator, Callable, Generic, Sequence, TypeVar
+
+from pydantic import BaseModel
+
+from frost_shard.domain.repository import Repository
+
+ReadModel = TypeVar("ReadModel")
+CreateModel = TypeVar("CreateModel", bound=BaseModel)
+
+
+class ReplicaRepository(Generic[ReadModel, CreateModel]):
+    """Repository sending the writes to the primary and reads to a replica.
+
+    Clients that have just written should read from the primary instead,
+    so they see their own writes before those reach the replica, see
+    'ReplicaPins'.
+    """
+
+    def __init__(
+        self,
+        primary: Repository[ReadModel, CreateModel],
+        replica: Repository[ReadModel, CreateModel],
+    ) -> None:
+        self.primary = primary
+        self.replica = replica
+
+    async def create(self, data: CreateModel) -> ReadModel:
+        """Create a new entry on the primary."""
+        return await self.primary.create(data)
+
+    async def create_many(self, data: Sequence[CreateModel]) -> list[ReadModel]:
+        """Create new entries on the primary."""
+        return await self.primary.create_many(data)
+
+    async def collect(self, **options: Any) -> list[ReadModel]:
+        """Collect entries from the replica."""
+        return await self.replica.collect(**options)
+
+    def stream(self, **options: Any) -> AsyncIterator[ReadModel]:
+        """Iterate over entries from the replica."""
+        return self.replica.stream(**options)
+
+    async def count(self, **options: Any) -> list[tuple[Any, int]]:
+        """Count entries on the replica."""
+        return await self.replica.count(**options)
+
+    async def get_version(self, **options: Any) -> int | None:
+        """Get the version from the replica."""
+        return await self.replica.get_version(**options)
+
+
+class ReplicaPins:
+    """Signed pins keeping the clients on the primary after their writes.
+
+    The pin is handed to the client and passed back with its following
+    requests, so every worker on every host can tell the client has to
+    read from the primary, without sharing any state. Only the expiry
+    time is signed, the pin tells nothing about the client.
+    """
+
+    def __init__(
+        self,
+        key: bytes,
+        ttl: int,
+        *,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.key = key
+        self.ttl = ttl
+        self.clock = clock
+
+    def create(self) -> str:
+        """Create a pin valid for the next 'ttl' seconds."""
+        expires_at = str(int(self.clock()) + self.ttl)
+        return f"{expires_at}.{self._sign(expires_at)}"
+
+    def is_pinned(self, pin: str | None) -> bool:
+        """Check if the pin was created here and hasn't expired yet."""
+        if not pin:
+            return False
+        expires_at, _, signature = pin.partition(".")
+        if not hmac.compare_digest(
+            signature.encode(),
+            self._sign(expires_at).encode(),
+        ):
+            return False
+        return expires_at.isdigit() and int(expires_at) > self.clock()
+
+    def _sign(self, expires_at: str) -> str:
+        """Sign the expiry time of the pin."""
+        return hmac.new(
+            self.key,
+            expires_at.encode(),
+            hashlib.sha256,
+        ).hexdigest()
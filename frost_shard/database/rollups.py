@@ -0,0 +1,91 @@
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.sql import Executable
+from sqlmodel import SQLModel
+
+from frost_shard.database.models import RollupSQLModel
+
+
+@dataclass(frozen=True)
+class CountRollup:
+    """Number of entries for every combination of the 'keys' values.
+
+    Counts live in a table of their own, with the 'keys' fields as the
+    primary key and the number of matching entries in the 'count' field.
+    Entries missing any of the key values are not counted.
+    """
+
+    table: type[RollupSQLModel]
+    keys: tuple[str, ...]
+
+    def covers(self, fields: Iterable[str]) -> bool:
+        """Check if the counts can be filtered and grouped by given fields.
+
+        Args:
+            fields (Iterable[str]): Field names, with optional lookups.
+
+        Returns:
+            bool: Whether all the fields are among the keys.
+        """
+        return all(field.split("__")[0] in self.keys for field in fields)
+
+    def increment(self, entries: Iterable[Any]) -> Insert | None:
+        """Prepare the upsert adding given entries to the counts.
+
+        Keys are sorted, so concurrent upserts lock the rows in the same
+        order and can't deadlock.
+
+        Args:
+            entries (Iterable[Any]): Newly created entries.
+
+        Returns:
+            Insert | None: Upsert statement or None if nothing is counted.
+        """
+        counts = Counter(
+            tuple(getattr(entry, key) for key in self.keys) for entry in entries
+        )
+        rows = [
+            {**dict(zip(self.keys, values)), "count": count}
+            for values, count in sorted(
+                (values, count)
+                for values, count in counts.items()
+                if None not in values
+            )
+        ]
+        if not rows:
+            return None
+
+        statement = insert(self.table).values(rows)
+        return statement.on_conflict_do_update(
+            index_elements=self.keys,
+            set_={"count": self.table.count + statement.excluded.count},
+        )
+
+    def rebuild(self, source: type[SQLModel]) -> list[Executable]:
+        """Prepare the statements counting all the 'source' entries anew.
+
+        The source table is locked against writes until the transaction
+        ends, so no entry is counted twice or missed.
+
+        Args:
+            source (type[SQLModel]): Model of the counted entries.
+
+        Returns:
+            list[Executable]: Statements to run in a single transaction.
+        """
+        columns = [getattr(source, key) for key in self.keys]
+        source_table = source.__table__.name  # type: ignore
+        return [
+            text(f"LOCK TABLE {source_table} IN SHARE MODE"),
+            delete(self.table),
+            insert(self.table).from_select(
+                [*self.keys, "count"],
+                select(*columns, func.count())
+                .where(*(column.is_not(None) for column in columns))
+                .group_by(*columns),
+            ),
+        ]
@@ -0,0 +1,123 @@
+import asyncio
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncContextManager, Callable
+
+from sqlalchemy import bindparam, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from structlog import get_logger
+
+from frost_shard.database.models import FileSQLModel
+from frost_shard.domain.crypto_service import CryptoService
+
+logger = get_logger(__name__)
+
+files = FileSQLModel.__table__  # type: ignore
+
+
+class KeyRotationWorker:
+    """Re-encrypt the emails of all the files with the current secret key.
+
+    Walks the file table in the primary key order, a batch at a time, and
+    writes every batch back with a single bulk UPDATE. The pace is limited
+    to 'rows_per_second', so the job can run next to the live traffic, and
+    the last rotated id is saved in the checkpoint file, so an interrupted
+    run continues where it has stopped.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncContextManager[AsyncSession]],
+        crypto_service: CryptoService,
+        *,
+        batch_size: int = 500,
+        rows_per_second: int = 1000,
+        checkpoint: Path | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.crypto = crypto_service
+        self.batch_size = batch_size
+        self.rows_per_second = rows_per_second
+        self.checkpoint = checkpoint
+
+    async def run(self) -> int:
+        """Rotate all the files left since the checkpoint.
+
+        Returns:
+            int: Number of rotated files.
+        """
+        last_id = self._load_checkpoint()
+        logger.info("Rotating secret keys", last_id=last_id)
+
+        rotated = 0
+        while True:
+            started_at = time.monotonic()
+            async with self.session_factory() as session:
+                batch_ids = await self._rotate_batch(session, last_id)
+            if not batch_ids:
+                break
+
+            last_id = batch_ids[-1]
+            rotated += len(batch_ids)
+            self._save_checkpoint(last_id)
+            logger.info("Rotated files", rotated=rotated, last_id=last_id)
+
+            # Sleep off the rest of the time budget for this batch
+            elapsed = time.monotonic() - started_at
+            await asyncio.sleep(
+                max(len(batch_ids) / self.rows_per_second - elapsed, 0),
+            )
+
+        self._clear_checkpoint()
+        logger.info("Secret keys rotated", rotated=rotated)
+        return rotated
+
+    async def _rotate_batch(
+        self,
+        session: AsyncSession,
+        last_id: uuid.UUID | None,
+    ) -> list[uuid.UUID]:
+        """Rotate the batch of files placed after the given id."""
+        query = select(files.c.id, files.c.email)
+        if last_id is not None:
+            query = query.where(files.c.id > last_id)
+        query = query.order_by(files.c.id).limit(self.batch_size)
+        rows = (await session.execute(query)).all()
+        if not rows:
+            return []
+
+        emails = [
+            email
+            async for chunk in self.crypto.rotate_many(
+                row.email for row in rows
+            )
+            for email in chunk
+        ]
+        await session.execute(
+            update(files)
+            .where(files.c.id == bindparam("_id"))
+            .values(email=bindparam("_email")),
+            [
+                {"_id": row.id, "_email": email}
+                for row, email in zip(rows, emails)
+            ],
+        )
+        await session.commit()
+        return [row.id for row in rows]
+
+    def _load_checkpoint(self) -> uuid.UUID | None:
+        """Read the last rotated id, if there is a checkpoint."""
+        if self.checkpoint is None or not self.checkpoint.exists():
+            return None
+        return uuid.UUID(self.checkpoint.read_text().strip())
+
+    def _save_checkpoint(self, last_id: uuid.UUID) -> None:
+        """Remember the last rotated id."""
+        if self.checkpoint is not None:
+            self.checkpoint.write_text(str(last_id))
+
+    def _clear_checkpoint(self) -> None:
+        """Remove the checkpoint, so the next rotation starts from scratch."""
+        if self.checkpoint is not None:
+            self.checkpoint.unlink(missing_ok=True)
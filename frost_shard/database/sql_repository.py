@@ -1,11 +1,17 @@
-from typing import Any, Generic, TypeVar
+from typing import Any, AsyncIterator, Generic, Sequence, TypeVar
 
 from pydantic import BaseModel
+from sqlalchemy import Date, cast, func, insert
 from sqlmodel import SQLModel, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql.expression import Select, SelectOfScalar
 
-from frost_shard.database.expressions import create_expressions
+from frost_shard.database.expressions import (
+    create_expressions,
+    create_keyset_expression,
+)
+from frost_shard.database.rollups import CountRollup
+from frost_shard.metrics import REPOSITORY_QUERY_SECONDS, observe_rows
 
 # TODO: Temporary workaround for SQLModel caching problems
 SelectOfScalar.inherit_cache = True  # type: ignore
@@ -14,29 +20,202 @@ Select.inherit_cache = True  # type: ignore
 ReadModel = TypeVar("ReadModel", bound=SQLModel)
 CreateModel = TypeVar("CreateModel", bound=BaseModel)
 
+# Maximum number of bind parameters in a single Postgres statement
+MAX_STATEMENT_PARAMS = 32767
+
 
 class SQLRepository(Generic[ReadModel, CreateModel]):
     """Concrete repository for the SQL database models."""
 
     session: AsyncSession
 
-    def __init__(self, table: type[ReadModel]) -> None:
+    def __init__(
+        self,
+        table: type[ReadModel],
+        ordering: Sequence[str] = ("id",),
+        fetch_size: int = 1000,
+        rollups: Sequence[CountRollup] = (),
+    ) -> None:
         self.table = table
+        self.ordering = tuple(ordering)
+        self.fetch_size = fetch_size
+        self.rollups = tuple(rollups)
 
     async def create(self, data: CreateModel) -> ReadModel:
-        """Create a new entry of the 'table' type."""
-        entry = self.table.from_orm(data)
-        self.session.add(entry)
-        await self.session.commit()
-        await self.session.refresh(entry)
-        return entry
-
-    async def collect(self, **filters: dict[str, Any]) -> list[ReadModel]:
-        """Collect all objects of the 'table' type matching given filters."""
+        """Create a new entry of the 'table' type.
+
+        The entry is written and read back with a single INSERT ... RETURNING
+        statement, skipping the unit of work and the separate refresh query.
+        """
+        entries = await self.create_many([data])
+        return entries[0]
+
+    async def create_many(self, data: Sequence[CreateModel]) -> list[ReadModel]:
+        """Create new entries of the 'table' type in a single transaction.
+
+        Entries are written with multi-row INSERT ... RETURNING statements,
+        as big as the parameters limit allows, instead of one at a time.
+        The 'rollups' are updated in the same transaction.
+        """
+        table = self.table.__table__  # type: ignore
+        # Let the model fill in the defaults for all the missing values
+        values = [
+            self.table(**entry.dict(exclude_none=True)).dict() for entry in data
+        ]
+        rows_per_statement = MAX_STATEMENT_PARAMS // len(table.columns)
+
+        entries: list[ReadModel] = []
+        with REPOSITORY_QUERY_SECONDS.labels("create_many").time():
+            for offset in range(0, len(values), rows_per_statement):
+                end = offset + rows_per_statement
+                result = await self.session.execute(
+                    insert(table)
+                    .values(values[offset:end])
+                    .returning(*table.columns),
+                )
+                entries.extend(self.table(**row) for row in result.mappings())
+            # Keep the counts in sync within the same transaction
+            for rollup in self.rollups:
+                statement = rollup.increment(entries)
+                if statement is not None:
+                    await self.session.execute(statement)
+            await self.session.commit()
+        return entries
+
+    async def collect(
+        self,
+        *,
+        page: int = 0,
+        limit: int | None = None,
+        after: Sequence[Any] | None = None,
+        **filters: Any,
+    ) -> list[ReadModel]:
+        """Collect a page of objects of the 'table' type matching filters.
+
+        Objects are sorted by the 'ordering' fields, with NULLs last. If
+        'after' is given, only the objects placed after these field values
+        are collected.
+        The rows skipped by the page offset count as scanned.
+        """
+        query = self._prepare_query(page, limit, after, filters)
+        with REPOSITORY_QUERY_SECONDS.labels("collect").time():
+            result = await self.session.execute(query)
+            # TODO: For some reason every entry is a one element tuple
+            entries = [entry[0] for entry in result.all()]
+        skipped = page * limit if limit is not None else 0
+        observe_rows("collect", skipped + len(entries), len(entries))
+        return entries
+
+    async def stream(
+        self,
+        *,
+        page: int = 0,
+        limit: int | None = None,
+        after: Sequence[Any] | None = None,
+        **filters: Any,
+    ) -> AsyncIterator[ReadModel]:
+        """Iterate over objects of the 'table' type matching filters.
+
+        Works like 'collect', but reads the objects through a server side
+        cursor, 'fetch_size' rows at a time, so only a single batch is kept
+        in memory no matter how many objects match. Only the time until
+        the first batch arrives counts as the query time.
+        """
+        query = self._prepare_query(page, limit, after, filters)
+        with REPOSITORY_QUERY_SECONDS.labels("stream").time():
+            result = await self.session.stream_scalars(
+                query.execution_options(yield_per=self.fetch_size),
+            )
+        streamed = 0
+        try:
+            async for entry in result:
+                streamed += 1
+                yield entry
+        finally:
+            skipped = page * limit if limit is not None else 0
+            observe_rows("stream", skipped + streamed, streamed)
+
+    async def count(
+        self,
+        *,
+        group_by: str,
+        period: str,
+        **filters: Any,
+    ) -> list[tuple[Any, int]]:
+        """Count objects of the 'table' type matching filters, per period.
+
+        Objects are grouped by the 'group_by' date field truncated to the
+        start of the 'period' in the database, so no rows are fetched.
+        Objects without the date are left out. If one of the 'rollups'
+        covers the fields, its counts are summed up instead, so only the
+        rollup rows count as scanned.
+        """
+        source: Any = self.table
+        total = func.count()
+        for rollup in self.rollups:
+            if rollup.covers([group_by, *filters]):
+                source = rollup.table
+                total = func.sum(source.count)
+                break
+
+        column = getattr(source, group_by)
+        bucket = cast(func.date_trunc(period, column), Date).label("bucket")
+        # Only models and columns are typed in the 'select' overloads
+        query = select(bucket, total, func.count())  # type: ignore
+        query = query.where(column.is_not(None))
+        if filters:
+            query = query.where(*create_expressions(source, filters))
+        # Refer to the label, so the truncated date is bound only once
+        query = query.group_by("bucket").order_by("bucket")
+        with REPOSITORY_QUERY_SECONDS.labels("count").time():
+            result = await self.session.execute(query)
+            rows = result.all()
+        observe_rows("count", sum(row[2] for row in rows), len(rows))
+        return [(period_start, count) for period_start, count, _ in rows]
+
+    async def get_version(self, **filters: Any) -> int | None:
+        """Count all the objects of the 'table' type matching filters.
+
+        Objects are never deleted, so the count changes with every write.
+        It's read from the smallest of the 'rollups' covering the filters,
+        so the table itself is never scanned. Without such rollup, there
+        is no version.
+        """
+        rollups = [rollup for rollup in self.rollups if rollup.covers(filters)]
+        if not rollups:
+            return None
+
+        rollup = min(rollups, key=lambda rollup: len(rollup.keys))
+        total = func.coalesce(func.sum(rollup.table.count), 0)
+        query = select(total)  # type: ignore
+        if filters:
+            query = query.where(*create_expressions(rollup.table, filters))
+        with REPOSITORY_QUERY_SECONDS.labels("get_version").time():
+            result = await self.session.execute(query)
+            return int(result.scalar_one())
+
+    def _prepare_query(
+        self,
+        page: int,
+        limit: int | None,
+        after: Sequence[Any] | None,
+        filters: dict[str, Any],
+    ) -> SelectOfScalar[ReadModel]:
+        """Prepare the ordered select query for given filters and page."""
         query = select(self.table)
         if filters:
             expressions = create_expressions(self.table, filters)
-            query = select(self.table).where(*expressions)
-        result = await self.session.execute(query)
-        # TODO: For some reason every entry is a one element tuple
-        return [entry[0] for entry in result.all()]
+            query = query.where(*expressions)
+        if after is not None:
+            query = query.where(
+                create_keyset_expression(self.table, self.ordering, after),
+            )
+        query = query.order_by(
+            *(
+                getattr(self.table, field).asc().nulls_last()
+                for field in self.ordering
+            ),
+        )
+        if limit is not None:
+            query = query.offset(page * limit).limit(limit)
+        return query
@@ -1,16 +1,178 @@
-from cryptography.fernet import Fernet
+import asyncio
+import hashlib
+import hmac
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from itertools import islice
+from typing import AsyncIterator, Iterable, Sequence
+
+from cryptography.fernet import Fernet, MultiFernet
+
+from frost_shard.metrics import CRYPTO_MESSAGES, CRYPTO_SECONDS
+
+
+@lru_cache(maxsize=None)
+def get_fernet(secrets: tuple[str, ...]) -> MultiFernet:
+    """Get the Fernet instance for the secrets, built once per process.
+
+    Messages are encrypted with the first secret, and decrypted with any
+    of them, tried in order.
+    """
+    return MultiFernet([Fernet(secret) for secret in secrets])
+
+
+def transform_chunk(
+    secrets: tuple[str, ...],
+    operation: str,
+    chunk: list[bytes],
+) -> list[bytes]:
+    """Encrypt, decrypt or rotate the whole chunk of messages.
+
+    Defined on the module level, so it can be sent to a process pool.
+    """
+    transform = getattr(get_fernet(secrets), operation)
+    return [transform(msg) for msg in chunk]
+
+
+def create_executor(kind: str, workers: int | None = None) -> Executor:
+    """Create the pool for running the cryptographic operations.
+
+    Args:
+        kind (str): Either 'thread' or 'process'.
+        workers (int | None): Number of workers, picked by the pool if empty.
+
+    Raises:
+        ValueError: If the kind of the pool is not supported.
+
+    Returns:
+        Executor: Thread or process pool.
+    """
+    match kind:
+        case "thread":
+            return ThreadPoolExecutor(workers, thread_name_prefix="crypto")
+        case "process":
+            return ProcessPoolExecutor(workers)
+        case _:
+            raise ValueError(f"Unsupported executor: {kind}")
+
+
+def observe_chunk(
+    operation: str,
+    size: int,
+    start: float,
+    future: asyncio.Future,
+) -> None:
+    """Record the chunk of messages once it's transformed."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    CRYPTO_MESSAGES.labels(operation).inc(size)
+    CRYPTO_SECONDS.labels(f"{operation}_chunk").observe(
+        time.perf_counter() - start,
+    )
 
 
 class CryptoService:
     """Simple service to encrypt and decrypt messages using 'cryptography'."""
 
-    def __init__(self, secret: str) -> None:
-        self.fernet = Fernet(secret)
+    def __init__(
+        self,
+        secret: str,
+        index_key: str,
+        *,
+        previous_secrets: Sequence[str] = (),
+        executor: Executor | None = None,
+        chunk_size: int = 500,
+        concurrency: int = 1,
+    ) -> None:
+        if not index_key:
+            # Stored digests can't be recomputed, so the key must never change
+            raise ValueError("Index key is required for the blind index")
+        self.secrets = (secret, *previous_secrets)
+        self.fernet = get_fernet(self.secrets)
+        self.index_key = index_key.encode()
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
 
     def encrypt(self, msg: bytes) -> bytes:
         """Encrypt the message using the secret key."""
-        return self.fernet.encrypt(msg)
+        CRYPTO_MESSAGES.labels("encrypt").inc()
+        with CRYPTO_SECONDS.labels("encrypt").time():
+            return self.fernet.encrypt(msg)
 
     def decrypt(self, msg: bytes) -> bytes:
         """Decrypt the message using the secret key."""
-        return self.fernet.decrypt(msg)
+        CRYPTO_MESSAGES.labels("decrypt").inc()
+        with CRYPTO_SECONDS.labels("decrypt").time():
+            return self.fernet.decrypt(msg)
+
+    def rotate(self, msg: bytes) -> bytes:
+        """Re-encrypt the message with the current secret key."""
+        CRYPTO_MESSAGES.labels("rotate").inc()
+        with CRYPTO_SECONDS.labels("rotate").time():
+            return self.fernet.rotate(msg)
+
+    def digest(self, msg: bytes) -> bytes:
+        """Compute a deterministic keyed digest (blind index) of the message.
+
+        Unlike the ciphertext, the digest is always the same for the same
+        message, so it can be used for equality lookups in the database.
+        """
+        return hmac.new(self.index_key, msg, hashlib.sha256).digest()
+
+    def encrypt_many(self, msgs: Iterable[bytes]) -> AsyncIterator[list[bytes]]:
+        """Encrypt the messages in chunks, outside of the event loop."""
+        return self._transform_many("encrypt", msgs)
+
+    def decrypt_many(self, msgs: Iterable[bytes]) -> AsyncIterator[list[bytes]]:
+        """Decrypt the messages in chunks, outside of the event loop."""
+        return self._transform_many("decrypt", msgs)
+
+    def rotate_many(self, msgs: Iterable[bytes]) -> AsyncIterator[list[bytes]]:
+        """Re-encrypt the messages in chunks, outside of the event loop."""
+        return self._transform_many("rotate", msgs)
+
+    async def _transform_many(
+        self,
+        operation: str,
+        msgs: Iterable[bytes],
+    ) -> AsyncIterator[list[bytes]]:
+        """Run the operation over chunks of messages in the executor.
+
+        Up to 'concurrency' chunks are processed at the same time, and the
+        results are yielded chunk by chunk in the order of the messages.
+        The chunks still in flight are cancelled if the iteration stops
+        early, so the caller can stop as soon as it has what it needs.
+        Chunks are timed from the submission, including the wait for a
+        free worker, since the workers might run in other processes.
+        """
+        loop = asyncio.get_running_loop()
+        pending: deque[asyncio.Future[list[bytes]]] = deque()
+        msgs_iterator = iter(msgs)
+        try:
+            while chunk := list(islice(msgs_iterator, self.chunk_size)):
+                future = loop.run_in_executor(
+                    self.executor,
+                    transform_chunk,
+                    self.secrets,
+                    operation,
+                    chunk,
+                )
+                future.add_done_callback(
+                    partial(
+                        observe_chunk,
+                        operation,
+                        len(chunk),
+                        time.perf_counter(),
+                    ),
+                )
+                pending.append(future)
+                if len(pending) >= self.concurrency:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,9 @@
+import enum
+
+
+class StatsPeriod(str, enum.Enum):
+    """Length of the period the statistics are bucketed by."""
+
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
@@ -0,0 +1,2 @@
+class InvalidInputError(Exception):
+    """Base exception for all the invalid input errors."""
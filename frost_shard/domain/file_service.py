@@ -1,13 +1,19 @@
+import hashlib
 from dataclasses import asdict
-from typing import Any, Generic, TypeAlias, TypeVar
+from typing import Any, AsyncIterator, Generic, Sequence, TypeAlias, TypeVar
 
 from structlog import get_logger
 
 from frost_shard.auth import models as auth_models
 from frost_shard.domain import models
 from frost_shard.domain.crypto_service import CryptoService
-from frost_shard.domain.filters import FileFilters, PaginationParams
-from frost_shard.domain.repository import Repository, paginate
+from frost_shard.domain.filters import (
+    FileCursor,
+    FileFilters,
+    PaginationParams,
+    StatsParams,
+)
+from frost_shard.domain.repository import Repository
 
 logger = get_logger(__name__)
 
@@ -53,10 +59,37 @@ class FileService(Generic[FileReadModelT]):
         encrypted_email = self.crypto.encrypt(user.email.encode())
         encrypted_data = models.FileEncryptedModel(
             email=encrypted_email,
+            email_hash=self.crypto.digest(user.email.encode()),
             date=data.date,
         )
         return await self.repository.create(encrypted_data)
 
+    async def create_many(
+        self,
+        user: auth_models.RequestUserModel,
+        data: Sequence[models.FileCreateModel],
+    ) -> list[FileReadModelT]:
+        """Create a batch of new files at once."""
+        logger.info("Creating new files", user=user, count=len(data))
+
+        email = user.email.encode()
+        email_hash = self.crypto.digest(email)
+        # Every file gets its own ciphertext, so they can't be linked
+        encrypted_emails = [
+            encrypted_email
+            async for chunk in self.crypto.encrypt_many([email] * len(data))
+            for encrypted_email in chunk
+        ]
+        encrypted_data = [
+            models.FileEncryptedModel(
+                email=encrypted_email,
+                email_hash=email_hash,
+                date=file_data.date,
+            )
+            for file_data, encrypted_email in zip(data, encrypted_emails)
+        ]
+        return await self.repository.create_many(encrypted_data)
+
     async def collect(
         self,
         user: auth_models.RequestUserModel,
@@ -71,24 +104,111 @@ class FileService(Generic[FileReadModelT]):
             pagination=pagination,
         )
 
-        # Prepare filters
-        filters_dict = asdict(filters, dict_factory=non_empty_dict_factory)
-        # Remove email from the filters and default it to the user's email
-        email = filters_dict.pop("email", user.email)
+        filters_dict = self._prepare_filters(user, filters)
+
+        # Continue right after the cursor if there is one
+        after = None
+        if pagination.after is not None:
+            after = FileCursor.decode(pagination.after).as_tuple()
 
-        # Fetch filtered files and prepare email filter generator
-        files = await self.repository.collect(**filters_dict)
-        files_per_email = (
-            file
-            for file in files
-            if self.crypto.decrypt(file.email).decode() == email
+        return await self.repository.collect(
+            page=pagination.page,
+            limit=pagination.limit,
+            after=after,
+            **filters_dict,
         )
 
-        # TODO: Move the pagination out of here or try to do it with redis
-        # Paginate filtered files
-        paginated_files = paginate(
-            files_per_email,
-            pagination.page,
-            pagination.limit,
+    async def stream(
+        self,
+        user: auth_models.RequestUserModel,
+        filters: FileFilters,
+    ) -> AsyncIterator[FileReadModelT]:
+        """Lazily iterate over all the files for given filters.
+
+        Files are fetched from the repository in batches while iterating,
+        so even the biggest listings are never loaded into memory at once.
+        """
+        logger.info("Streaming files", user=user, filters=filters)
+
+        filters_dict = self._prepare_filters(user, filters)
+        async for file in self.repository.stream(**filters_dict):
+            yield file
+
+    async def collect_stats(
+        self,
+        user: auth_models.RequestUserModel,
+        filters: FileFilters,
+        params: StatsParams,
+    ) -> list[models.FileStatsModel]:
+        """Count the files for given filters, bucketed by the period."""
+        logger.info(
+            "Fetching file stats",
+            user=user,
+            filters=filters,
+            params=params,
         )
-        return list(paginated_files)
+
+        filters_dict = self._prepare_filters(user, filters)
+        counts = await self.repository.count(
+            group_by="date",
+            period=params.period.value,
+            **filters_dict,
+        )
+        return [
+            models.FileStatsModel(period_start=period_start, count=count)
+            for period_start, count in counts
+        ]
+
+    async def get_etag(
+        self,
+        user: auth_models.RequestUserModel,
+        filters: FileFilters,
+        pagination: PaginationParams,
+        media_type: str,
+    ) -> str | None:
+        """Prepare the weak ETag of the files listing for given parameters.
+
+        It's based on the version of the owner's files, so it changes
+        with every new file of the owner, without running the listing.
+        The media type is included, so each format gets its own tag.
+        Returns nothing if the files are not versioned.
+        """
+        filters_dict = self._prepare_filters(user, filters)
+        version = await self.repository.get_version(
+            email_hash=filters_dict["email_hash"],
+        )
+        if version is None:
+            return None
+
+        payload = repr(
+            (version, sorted(filters_dict.items()), pagination, media_type),
+        )
+        return f'W/"{hashlib.sha256(payload.encode()).hexdigest()[:32]}"'
+
+    def get_next_cursor(
+        self,
+        files: list[FileReadModelT],
+        pagination: PaginationParams,
+    ) -> str | None:
+        """Prepare the cursor pointing to the page after given files.
+
+        Returns nothing if the page is not full, since there is nothing
+        left to fetch then.
+        """
+        if not files or len(files) < pagination.limit:
+            return None
+        last_file = files[-1]
+        return FileCursor(date=last_file.date, id=last_file.id).encode()
+
+    def _prepare_filters(
+        self,
+        user: auth_models.RequestUserModel,
+        filters: FileFilters,
+    ) -> dict:
+        """Prepare the repository filters from the API ones."""
+        filters_dict = asdict(filters, dict_factory=non_empty_dict_factory)
+        # Replace the email with its blind index, so it can be filtered in
+        # the database, and default it to the user's email
+        email = filters_dict.pop("email", user.email)
+        filters_dict["email_hash"] = self.crypto.digest(email.encode())
+        return filters_dict
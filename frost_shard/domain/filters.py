@@ -1,16 +1,90 @@
+import base64
+import binascii
 import datetime
+import json
+import uuid
 from dataclasses import dataclass
 
 from fastapi import Query
 from pydantic import EmailStr
 
+from frost_shard.domain.enums import StatsPeriod
+from frost_shard.domain.exceptions import InvalidInputError
+
 
 @dataclass(frozen=True)
 class PaginationParams:
     """Pagination parameters."""
 
-    page: int = Query(0)
-    limit: int = Query(10)
+    page: int = Query(0, ge=0)
+    limit: int = Query(10, ge=1)
+    after: str | None = Query(
+        None,
+        description="Cursor of the last file from the previous page",
+    )
+
+
+@dataclass(frozen=True)
+class StatsParams:
+    """Statistics parameters."""
+
+    period: StatsPeriod = Query(
+        StatsPeriod.DAY,
+        description="Period the file counts are bucketed by",
+    )
+
+
+@dataclass(frozen=True)
+class FileCursor:
+    """Position of a file in the listing order.
+
+    Files are listed by date and id, so the pair of them is enough to
+    continue the listing right after the given file. Files without a date
+    are listed last, so the date is empty for the cursors pointing there.
+    """
+
+    date: datetime.date | None
+    id: uuid.UUID
+
+    def encode(self) -> str:
+        """Encode the cursor to an opaque, URL safe string.
+
+        Returns:
+            str: Encoded cursor.
+        """
+        date = self.date.isoformat() if self.date is not None else None
+        payload = json.dumps([date, str(self.id)])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @classmethod
+    def decode(cls, cursor: str) -> "FileCursor":
+        """Decode the cursor from the string created with 'encode'.
+
+        Args:
+            cursor (str): Encoded cursor.
+
+        Raises:
+            InvalidInputError: If the cursor is malformed.
+
+        Returns:
+            FileCursor: Decoded cursor.
+        """
+        try:
+            date, id_ = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return cls(
+                date=(
+                    datetime.date.fromisoformat(date)
+                    if date is not None
+                    else None
+                ),
+                id=uuid.UUID(id_),
+            )
+        except (binascii.Error, TypeError, ValueError):
+            raise InvalidInputError("Invalid pagination cursor")
+
+    def as_tuple(self) -> tuple[datetime.date | None, uuid.UUID]:
+        """Return the cursor values in the listing order."""
+        return self.date, self.id
 
 
 @dataclass(frozen=True)
@@ -1,8 +1,10 @@
 import datetime
 import uuid
-from typing import Protocol
+from typing import TYPE_CHECKING, Protocol
 
-from pydantic import BaseModel
+from pydantic import BaseModel, conlist
+
+from frost_shard.settings import settings
 
 
 class FileReadModel(Protocol):
@@ -13,6 +15,21 @@ class FileReadModel(Protocol):
     date: datetime.date | None
 
 
+class FileResponseModel(BaseModel):
+    """Data model for the outgoing file payload.
+
+    Leaves out the blind index, since it would allow linking files by owner.
+    """
+
+    id: uuid.UUID
+    email: bytes
+    date: datetime.date | None
+
+    class Config:
+        frozen = True
+        orm_mode = True
+
+
 class FileCreateModel(BaseModel):
     """Data model for the incoming file payload."""
 
@@ -22,10 +39,32 @@ class FileCreateModel(BaseModel):
         frozen = True
 
 
+if TYPE_CHECKING:
+    # Constrained types are built at runtime, so mypy can't use them
+    FileBatchCreateModel = list[FileCreateModel]
+else:
+    FileBatchCreateModel = conlist(
+        FileCreateModel,
+        min_items=1,
+        max_items=settings.FILES_BATCH_MAX_SIZE,
+    )
+
+
+class FileStatsModel(BaseModel):
+    """Data model for the number of files in a period."""
+
+    period_start: datetime.date
+    count: int
+
+    class Config:
+        frozen = True
+
+
 class FileEncryptedModel(BaseModel):
     """Data model for the file creation."""
 
     email: bytes
+    email_hash: bytes
     date: datetime.date | None = None
 
     class Config:
@@ -1,4 +1,13 @@
-from typing import Generator, Generic, Iterable, Protocol, TypeVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Generator,
+    Generic,
+    Iterable,
+    Protocol,
+    Sequence,
+    TypeVar,
+)
 
 from pydantic import BaseModel
 
@@ -41,6 +50,60 @@ class Repository(Protocol, Generic[ReadModel, CreateModel]):
         """Create a new entry with given data."""
         ...
 
-    async def collect(self, **filters) -> list[ReadModel]:
-        """Collect all entries matching the given filters."""
+    async def create_many(self, data: Sequence[CreateModel]) -> list[ReadModel]:
+        """Create new entries with given data, all at once."""
+        ...
+
+    async def collect(
+        self,
+        *,
+        page: int = 0,
+        limit: int | None = None,
+        after: tuple[Any, ...] | None = None,
+        **filters,
+    ) -> list[ReadModel]:
+        """Collect a page of entries matching the given filters.
+
+        Entries are placed in a stable order, so the values of the last
+        entry can be passed as 'after' to continue with the next page.
+        """
+        ...
+
+    def stream(
+        self,
+        *,
+        page: int = 0,
+        limit: int | None = None,
+        after: tuple[Any, ...] | None = None,
+        **filters,
+    ) -> AsyncIterator[ReadModel]:
+        """Lazily iterate over entries matching the given filters.
+
+        Entries come in the same order as from 'collect', but are fetched
+        in batches while iterating instead of all at once.
+        """
+        ...
+
+    async def count(
+        self,
+        *,
+        group_by: str,
+        period: str,
+        **filters,
+    ) -> list[tuple[Any, int]]:
+        """Count entries matching the given filters, per period.
+
+        Entries are grouped by the 'group_by' date field truncated to the
+        start of the 'period', and the pairs of period start and count
+        are returned in the chronological order.
+        """
+        ...
+
+    async def get_version(self, **filters) -> int | None:
+        """Return the version of the entries matching the given filters.
+
+        Version changes whenever such entry is created, so it can be used
+        to tell if the previous results are still valid. Returns nothing if
+        the entries are not versioned.
+        """
         ...
@@ -1,6 +1,8 @@
 from fastapi import Request, responses, status
 
 from frost_shard.auth import exceptions
+from frost_shard.domain import exceptions as domain_exceptions
+from frost_shard.utils.profiler import ProfilerBusyError
 
 
 def handle_authentication_error(
@@ -25,9 +27,33 @@ def handle_permission_error(*_) -> responses.JSONResponse:
     )
 
 
+def handle_invalid_input_error(
+    _: Request,
+    exc: domain_exceptions.InvalidInputError,
+) -> responses.Response:
+    """Return a JSON response about the invalid input.
+
+    Use the exception message as the response content.
+    """
+    return responses.JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": str(exc)},
+    )
+
+
+def handle_profiler_busy_error(*_) -> responses.JSONResponse:
+    """Return a JSON response about the profile already being captured."""
+    return responses.JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": "Profile is already being captured"},
+    )
+
+
 EXCEPTION_HANDLERS = frozenset(
     {
         exceptions.AuthenticationError: handle_authentication_error,
         exceptions.PermissionsError: handle_permission_error,
+        domain_exceptions.InvalidInputError: handle_invalid_input_error,
+        ProfilerBusyError: handle_profiler_busy_error,
     }.items(),
 )
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, responses, status
+from fastapi import APIRouter, Depends, Query, responses, status
 
+from frost_shard.auth.dependencies import has_roles
+from frost_shard.auth.enums import UserRole
+from frost_shard.internal.dependencies import get_profiler
 from frost_shard.settings import settings
+from frost_shard.utils.profiler import LoopProfiler, ProfileFormat
 
 router = APIRouter(tags=["internal"], include_in_schema=False)
 
@@ -31,3 +35,42 @@ async def healthcheck() -> dict:
         dict: Status of the service.
     """
     return {"detail": "Ok"}
+
+
+@router.get(
+    "/profile",
+    status_code=status.HTTP_200_OK,
+    dependencies=(Depends(has_roles((UserRole.ADMIN,))),),
+)
+async def profile(
+    seconds: float = Query(10, gt=0, le=settings.PROFILER_MAX_SECONDS),
+    profile_format: ProfileFormat = Query(
+        ProfileFormat.COLLAPSED,
+        alias="format",
+    ),
+    profiler: LoopProfiler = Depends(get_profiler),
+) -> responses.Response:
+    """Profile the event loop of the process for the given time.
+
+    Stacks are sampled while the process keeps serving other requests.
+    Only a single profile is captured at once, 409 is returned otherwise.
+
+    Args:
+        seconds (float): Duration of the capture.
+        profile_format (ProfileFormat): Collapsed stacks or speedscope.
+        profiler (LoopProfiler): Event loop profiler.
+
+    Returns:
+        Response: Captured profile in the requested format.
+    """
+    captured = await profiler.capture(seconds)
+    if profile_format == ProfileFormat.SPEEDSCOPE:
+        return responses.JSONResponse(
+            captured.to_speedscope(),
+            headers={
+                "Content-Disposition": (
+                    'attachment; filename="profile.speedscope.json"'
+                ),
+            },
+        )
+    return responses.PlainTextResponse(captured.to_collapsed())
@@ -0,0 +1,10 @@
+from functools import lru_cache
+
+from frost_shard.settings import settings
+from frost_shard.utils.profiler import LoopProfiler
+
+
+@lru_cache(maxsize=1)
+def get_profiler() -> LoopProfiler:
+    """Prepare the event loop profiler, shared by all requests."""
+    return LoopProfiler(interval=settings.PROFILER_INTERVAL_MS / 1000)
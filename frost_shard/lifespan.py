@@ -0,0 +1,81 @@
+import asyncio
+import time
+from typing import Awaitable
+
+from structlog import get_logger
+
+from frost_shard.auth.dependencies import get_auth_service
+from frost_shard.database import connection
+from frost_shard.domain.models import FileResponseModel
+from frost_shard.internal.dependencies import get_profiler
+from frost_shard.settings import settings
+from frost_shard.v1.dependencies import (
+    get_crypto_service,
+    get_replica_pins,
+    get_write_batcher,
+)
+from frost_shard.v1.responses import get_row_encoder
+
+logger = get_logger(__name__)
+
+
+async def warm_up_crypto() -> None:
+    """Start the crypto pool, by sending a single message through it."""
+    async for _ in get_crypto_service().encrypt_many([b"warm-up"]):
+        pass
+
+
+async def warm_up() -> None:
+    """Prepare everything the first requests would otherwise wait for.
+
+    Shared services are built, the pools are filled with connections,
+    and the JWKs are fetched. Every step is best effort, a failed one is
+    only logged and left for the first request, as without the warm-up.
+    """
+    start = time.perf_counter()
+    get_replica_pins()
+    get_profiler()
+    get_row_encoder(FileResponseModel)
+    if settings.WRITE_BATCH_ENABLED:
+        get_write_batcher()
+
+    steps: dict[str, Awaitable] = {
+        "crypto": warm_up_crypto(),
+        "database": connection.prewarm_pool(
+            connection.get_engine(),
+            settings.DATABASE_POOL_PREWARM,
+        ),
+    }
+    for number, engine in enumerate(connection.get_replica_engines()):
+        steps[f"replica_{number}"] = connection.prewarm_pool(
+            engine,
+            settings.DATABASE_POOL_PREWARM,
+        )
+    if settings.AUTH_DOMAIN:  # pragma: no cover
+        steps["jwks"] = get_auth_service().token_service.refresh_jwks()
+
+    results = await asyncio.gather(*steps.values(), return_exceptions=True)
+    for step, result in zip(steps, results):
+        if isinstance(result, Exception):
+            logger.warning("Failed to warm up", step=step, error=repr(result))
+    logger.info(
+        "Warmed up",
+        duration_ms=round((time.perf_counter() - start) * 1000, 3),
+    )
+
+
+async def shut_down() -> None:
+    """Finish the pending work and release the resources of the process.
+
+    Batched writes still need the database, so they are written before
+    the connections are closed. The crypto pool is stopped last, and the
+    service is built again with a new pool if it's needed after all.
+    """
+    if settings.WRITE_BATCH_ENABLED:
+        await get_write_batcher().close()
+    await connection.dispose_engines()
+    crypto_service = get_crypto_service()
+    get_crypto_service.cache_clear()
+    if crypto_service.executor is not None:
+        # Waits for the chunks in progress, without blocking the loop
+        await asyncio.to_thread(crypto_service.executor.shutdown)
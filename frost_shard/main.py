@@ -11,20 +11,25 @@ logger = get_logger(__name__)
 
 
 def create_application() -> FastAPI:
-    """Create the FastAPI application."""
+    """Create the FastAPI application with all of its components.
+
+    Nothing is connected here, the database pool, the JWKs and the shared
+    services are prepared by the startup hook, before the first request.
+    """
     logger.info("Creating app")
-    return FastAPI(
+    app = FastAPI(
         title=settings.TITLE,
         version=settings.VERSION,
         description=settings.DESCRIPTION,
         docs_url=f"{settings.API_PREFIX}/api/docs",
     )
 
+    bootstrap(app)
 
-app = create_application()
+    app.include_router(internal_router, prefix=settings.API_PREFIX)
+    app.include_router(auth_router, prefix=settings.API_PREFIX)
+    app.include_router(v1_router, prefix=settings.API_PREFIX)
+    return app
 
-bootstrap(app)
 
-app.include_router(internal_router, prefix=settings.API_PREFIX)
-app.include_router(auth_router, prefix=settings.API_PREFIX)
-app.include_router(v1_router, prefix=settings.API_PREFIX)
+app = create_application()
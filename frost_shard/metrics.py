@@ -0,0 +1,118 @@
+"""Prometheus metrics of the application internals.
+
+Labels only ever take values from a fixed set, like the operation names,
+so the number of the series stays the same no matter the traffic.
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy.pool import Pool
+
+# Tighter buckets for the steps taking microseconds rather than seconds
+FAST_BUCKETS = (
+    0.00001,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+)
+
+POOL_CHECKOUT_SECONDS = Histogram(
+    "frost_shard_db_pool_checkout_seconds",
+    "Time spent waiting for a connection from the database pool.",
+)
+POOL_IN_USE = Gauge(
+    "frost_shard_db_pool_in_use",
+    "Number of connections checked out from the database pool.",
+)
+POOL_OVERFLOW = Gauge(
+    "frost_shard_db_pool_overflow",
+    "Number of connections opened above the database pool size.",
+)
+
+TOKEN_VERIFY_SECONDS = Histogram(
+    "frost_shard_auth_token_verify_seconds",
+    "Time spent verifying the access tokens, by the result.",
+    ("result",),
+    buckets=FAST_BUCKETS,
+)
+JWKS_FETCH_SECONDS = Histogram(
+    "frost_shard_auth_jwks_fetch_seconds",
+    "Time spent fetching the JWKs from the auth API, by the result.",
+    ("result",),
+)
+
+REPOSITORY_QUERY_SECONDS = Histogram(
+    "frost_shard_repository_query_seconds",
+    "Time spent running the repository queries, by the operation.",
+    ("operation",),
+    buckets=FAST_BUCKETS,
+)
+REPOSITORY_ROWS = Counter(
+    "frost_shard_repository_rows",
+    "Rows the database went through and rows returned, by the operation.",
+    ("operation", "kind"),
+)
+
+CRYPTO_SECONDS = Histogram(
+    "frost_shard_crypto_seconds",
+    "Time spent on single messages or chunks of them, by the operation.",
+    ("operation",),
+    buckets=FAST_BUCKETS,
+)
+CRYPTO_MESSAGES = Counter(
+    "frost_shard_crypto_messages",
+    "Messages encrypted, decrypted or rotated, by the operation.",
+    ("operation",),
+)
+
+STATEMENTS = Counter(
+    "frost_shard_db_statements",
+    "Statements executed, by the fingerprint.",
+    ("fingerprint",),
+)
+STATEMENT_SECONDS = Counter(
+    "frost_shard_db_statement_seconds",
+    "Time spent executing the statements, by the fingerprint.",
+    ("fingerprint",),
+)
+STATEMENT_ROWS = Counter(
+    "frost_shard_db_statement_rows",
+    "Rows returned or affected by the statements, by the fingerprint.",
+    ("fingerprint",),
+)
+SLOW_STATEMENTS = Counter(
+    "frost_shard_db_slow_statements",
+    "Statements over the slow query threshold, by the fingerprint.",
+    ("fingerprint",),
+)
+
+SERIALIZATION_SECONDS = Histogram(
+    "frost_shard_serialization_seconds",
+    "Time spent encoding the listed files, by the media type.",
+    ("media_type",),
+    buckets=FAST_BUCKETS,
+)
+
+
+def observe_pool(pool: Pool) -> None:
+    """Export the usage of the given pool through the gauges."""
+    POOL_IN_USE.set_function(pool.checkedout)  # type: ignore
+    # Overflow counts down from minus pool size until the pool is filled
+    POOL_OVERFLOW.set_function(lambda: max(pool.overflow(), 0))  # type: ignore
+
+
+def observe_rows(operation: str, scanned: int, returned: int) -> None:
+    """Count the rows the database went through and the rows returned."""
+    REPOSITORY_ROWS.labels(operation, "scanned").inc(scanned)
+    REPOSITORY_ROWS.labels(operation, "returned").inc(returned)
@@ -1,4 +1,6 @@
-from pydantic import BaseSettings
+from typing import Literal
+
+from pydantic import BaseSettings, validator
 
 
 class Settings(BaseSettings):
@@ -16,16 +18,47 @@ class Settings(BaseSettings):
     CORS_ALLOW_ORIGINS: list[str] = []
     API_PREFIX: str = "/fs"
     RATE_LIMIT: int = 30
+    RATE_LIMIT_STORAGE: str = ""  # Per-process counters if empty
+    FILES_BATCH_MAX_SIZE: int = 1000
+    FAST_SERIALIZATION: bool = False  # Requires the 'fast' extra
+    PROFILER_INTERVAL_MS: int = 10
+    PROFILER_MAX_SECONDS: int = 60
 
     # Database
     DATABASE_URL: str = ""
     DATABASE_NAME: str = ""
+    DATABASE_REPLICA_URLS: list[str] = []
+    DATABASE_REPLICA_PIN_SECONDS: int = 0  # Read-your-writes disabled
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: int = 30
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = False
+    DATABASE_POOL_PREWARM: int = 1  # Connections opened on startup
+    DATABASE_STATEMENT_CACHE_SIZE: int = 100
+    DATABASE_STATEMENT_TIMEOUT: int = 0  # Milliseconds, disabled by default
+    DATABASE_FETCH_SIZE: int = 1000
+    DATABASE_STATEMENT_METRICS: bool = False
+    DATABASE_SLOW_QUERY_MS: int = 0  # Slow query log disabled by default
+    DATABASE_SLOW_QUERY_EXPLAIN: bool = False  # Runs slow SELECTs twice
+    WRITE_BATCH_ENABLED: bool = False
+    WRITE_BATCH_MAX_DELAY_MS: int = 5
+    WRITE_BATCH_MAX_SIZE: int = 100
 
     # Cryptography
     SECRET_KEY: str = ""
+    PREVIOUS_SECRET_KEYS: list[str] = []
+    BLIND_INDEX_KEY: str = ""
+    CRYPTO_EXECUTOR: str = "thread"
+    CRYPTO_WORKERS: int | None = None
+    CRYPTO_CHUNK_SIZE: int = 500
+    KEY_ROTATION_BATCH_SIZE: int = 500
+    KEY_ROTATION_ROWS_PER_SECOND: int = 1000
+    KEY_ROTATION_CHECKPOINT: str = ".key_rotation_checkpoint"
 
     # Auth
     AUTH_DOMAIN: str = ""
+    AUTH_SCHEME: Literal["https", "http"] = "https"  # HTTP only for testing
     AUDIENCE: str = ""
     ISSUER: str = ""
     ALGORITHMS: list[str] = []
@@ -33,9 +66,18 @@ class Settings(BaseSettings):
     CLIENT_SECRET: str = ""
     TOKEN_FIELD_NAME: str = "access_token"
     CUSTOM_CLAIM: str = ""
+    TOKEN_CACHE_MAX_BYTES: int = 1_000_000
 
     # Integrations
     SENTRY_DSN: str = ""
 
+    @validator("BLIND_INDEX_KEY", always=True)
+    @classmethod
+    def require_blind_index_key(cls, index_key: str) -> str:
+        """Refuse to compute any digests without a fixed index key."""
+        if not index_key:
+            raise ValueError("Required for the blind index")
+        return index_key
+
 
 settings = Settings()
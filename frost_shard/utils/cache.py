@@ -0,0 +1,108 @@
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, TypeVar
+
+Key = TypeVar("Key", bound=Hashable)
+Value = TypeVar("Value")
+
+
+@dataclass(frozen=True)
+class CacheEntry(Generic[Value]):
+    """Single value stored in the cache."""
+
+    value: Value
+    size: int
+    expires_at: float
+
+
+class LRUCache(Generic[Key, Value]):
+    """Least recently used cache bounded by the size of its entries.
+
+    Entries also expire after 'ttl' seconds (or their own ttl, if given on
+    set), and the cache keeps count of the hits and misses.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float = float("inf"),
+        sizeof: Callable[[object], int] = sys.getsizeof,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.clock = clock
+
+        self.entries: OrderedDict[Key, CacheEntry[Value]] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """Return the number of stored entries."""
+        return len(self.entries)
+
+    def get(self, key: Key) -> Value | None:
+        """Get the value for the key, if it's stored and not expired.
+
+        Args:
+            key (Key): Key of the entry.
+
+        Returns:
+            Value | None: Stored value.
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry.expires_at <= self.clock():
+            if entry is not None:
+                self.pop(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(
+        self,
+        key: Key,
+        value: Value,
+        ttl: float | None = None,
+        size: int | None = None,
+    ) -> None:
+        """Store the value and evict the least recently used entries.
+
+        Values bigger than the whole cache are not stored at all.
+
+        Args:
+            key (Key): Key of the entry.
+            value (Value): Value to store.
+            ttl (float | None): Seconds after which the entry expires.
+            size (int | None): Size of the entry, if known better than
+                'sizeof' does.
+        """
+        self.pop(key)
+        if size is None:
+            size = self.sizeof(key) + self.sizeof(value)
+        if size > self.max_size:
+            return
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        self.entries[key] = CacheEntry(value, size, expires_at)
+        self.size += size
+        while self.size > self.max_size:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def pop(self, key: Key) -> Value | None:
+        """Remove the entry and return its value, if it was stored."""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        self.size -= entry.size
+        return entry.value
+
+    def clear(self) -> None:
+        """Remove all the entries."""
+        self.entries.clear()
+        self.size = 0
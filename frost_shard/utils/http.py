@@ -0,0 +1,18 @@
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check if the 'If-None-Match' header matches the ETag.
+
+    Uses the weak comparison, as required for the 'If-None-Match' header.
+
+    Args:
+        if_none_match (str | None): Value of the 'If-None-Match' header.
+        etag (str): Current ETag of the resource.
+
+    Returns:
+        bool: Whether the client already has the current representation.
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
@@ -0,0 +1,190 @@
+import asyncio
+import enum
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from types import FrameType
+from typing import NamedTuple
+
+
+class ProfileFormat(str, enum.Enum):
+    """Output format of the captured profile."""
+
+    COLLAPSED = "collapsed"
+    SPEEDSCOPE = "speedscope"
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is already being captured."""
+
+
+class StackFrame(NamedTuple):
+    """Function on the sampled stack."""
+
+    name: str
+    file: str
+    line: int
+
+
+Stack = tuple[StackFrame, ...]
+
+
+def extract_stack(frame: FrameType | None) -> Stack:
+    """List the functions on the stack, from the outermost one."""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(
+            StackFrame(code.co_name, code.co_filename, code.co_firstlineno),
+        )
+        frame = frame.f_back
+    return tuple(reversed(frames))
+
+
+def sample_stacks(
+    thread_id: int,
+    interval: float,
+    stop: threading.Event,
+) -> Counter[Stack]:
+    """Count the stacks of the thread, sampled once per 'interval'.
+
+    Runs in another thread until stopped. The stack can only be read
+    when the sampled thread releases the GIL, so the samples lean
+    towards the I/O waits.
+    """
+    stacks: Counter[Stack] = Counter()
+    while not stop.wait(interval):
+        frame = sys._current_frames().get(thread_id)  # noqa: WPS437
+        if frame is None:
+            break
+        stacks[extract_stack(frame)] += 1
+    return stacks
+
+
+@dataclass(frozen=True)
+class Profile:
+    """Stacks sampled during the capture, with the number of samples."""
+
+    stacks: Counter[Stack]
+    interval: float
+    duration: float
+
+    def to_collapsed(self) -> str:
+        """Render the stacks in the collapsed format of the flame graphs."""
+        return "".join(
+            ";".join(
+                f"{frame.name} ({frame.file}:{frame.line})" for frame in stack
+            )
+            + f" {count}\n"
+            for stack, count in self.stacks.most_common()
+        )
+
+    def to_speedscope(self) -> dict:
+        """Render the stacks as a sampled profile of speedscope."""
+        frames: dict[StackFrame, int] = {}
+        samples = []
+        weights = []
+        for stack, count in self.stacks.most_common():
+            samples.append(
+                [frames.setdefault(frame, len(frames)) for frame in stack],
+            )
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "frost-shard",
+            "shared": {"frames": [frame._asdict() for frame in frames]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": "Event loop",
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.duration,
+                    "samples": samples,
+                    "weights": weights,
+                },
+            ],
+        }
+
+
+class LoopProfiler:
+    """Sampling profiler of the thread running the event loop.
+
+    Nothing is traced, the loop is only interrupted once per 'interval'
+    to record its stack, and keeps serving the requests as usual. In the
+    main thread, the stack is recorded from the timer signal handler,
+    right where the loop was interrupted. Other threads can't receive
+    signals, so they are sampled from a separate thread instead. Only
+    a single profile is captured at once.
+    """
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.capturing = False
+
+    async def capture(self, seconds: float) -> Profile:
+        """Sample the event loop for the given number of seconds.
+
+        Raises:
+            ProfilerBusyError: If another profile is being captured.
+
+        Returns:
+            Profile: Sampled stacks.
+        """
+        if self.capturing:
+            raise ProfilerBusyError()
+        self.capturing = True
+        try:
+            return await self._capture(seconds)
+        finally:
+            self.capturing = False
+
+    async def _capture(self, seconds: float) -> Profile:
+        """Sample the current thread until the time runs out."""
+        start = time.perf_counter()
+        if threading.current_thread() is threading.main_thread():
+            stacks = await self._sample_with_signals(seconds)
+        else:
+            stacks = await self._sample_with_thread(seconds)
+        return Profile(
+            stacks=stacks,
+            interval=self.interval,
+            duration=time.perf_counter() - start,
+        )
+
+    async def _sample_with_signals(self, seconds: float) -> Counter[Stack]:
+        """Record the interrupted stack on every tick of the real timer."""
+        stacks: Counter[Stack] = Counter()
+
+        def handle_tick(_: int, frame: FrameType | None) -> None:
+            stacks[extract_stack(frame)] += 1
+
+        previous_handler = signal.signal(signal.SIGALRM, handle_tick)
+        signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+        return stacks
+
+    async def _sample_with_thread(self, seconds: float) -> Counter[Stack]:
+        """Sample the current thread from another one."""
+        stop = threading.Event()
+        sampling = asyncio.create_task(
+            asyncio.to_thread(
+                sample_stacks,
+                threading.get_ident(),
+                self.interval,
+                stop,
+            ),
+        )
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            # Stop sampling even if the request was cancelled
+            stop.set()
+        return await sampling
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from typing import Callable
+
+from ratelimit import Rule
+from ratelimit.backends import BaseBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key BLOB PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_buckets_expires_at ON buckets (expires_at);
+CREATE TABLE IF NOT EXISTS blocked_users (
+    user BLOB PRIMARY KEY,
+    blocked_until REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteBackend(BaseBackend):
+    """Rate limiter backend shared by all the processes on the host.
+
+    Every rule of every user gets a token bucket, refilled continuously
+    up to the rule limit over the rule period. Buckets are kept in a
+    SQLite database in WAL mode, so all the workers see the same limits.
+    Full buckets are evicted, since they are the same as missing ones.
+    """
+
+    EVICTION_INTERVAL = 60
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        busy_timeout: float = 5,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        # Transactions are managed by hand, see '_retry_after'
+        self.connection = sqlite3.connect(
+            path,
+            timeout=busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.lock = threading.Lock()
+        self.clock = clock
+        self.next_eviction = 0.0
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            # Losing the counters on a power loss is fine, skip the fsyncs
+            self.connection.execute("PRAGMA synchronous=OFF")
+            self.connection.executescript(SCHEMA)
+
+    async def retry_after(self, path: str, user: str, rule: Rule) -> int:
+        """Take a token from all the rule buckets of the user.
+
+        Args:
+            path (str): Path of the request.
+            user (str): User key of the request.
+            rule (Rule): Rule matching the request.
+
+        Returns:
+            int: Seconds to wait before retrying, zero if allowed.
+        """
+        # Other workers may hold the database lock, don't block the loop
+        return await asyncio.to_thread(self._retry_after, path, user, rule)
+
+    def _retry_after(self, path: str, user: str, rule: Rule) -> int:
+        """Take the tokens within a single write transaction."""
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                retry_after = self._take_tokens(path, user, rule)
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+        return retry_after
+
+    def _take_tokens(self, path: str, user: str, rule: Rule) -> int:
+        """Take a token from every bucket if all of them have one."""
+        now = self.clock()
+        if now >= self.next_eviction:
+            self._evict(now)
+
+        user_key = self._hash(str(user))
+        row = self.connection.execute(
+            "SELECT blocked_until FROM blocked_users WHERE user = ?",
+            (user_key,),
+        ).fetchone()
+        if row is not None and row[0] > now:
+            return math.ceil(row[0] - now)
+
+        buckets = []
+        wait_time = 0.0
+        for rule_key, (limit, period) in rule.ruleset(path, user).items():
+            key = self._hash(rule_key)
+            rate = limit / period
+            row = self.connection.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE key = ?",
+                (key,),
+            ).fetchone()
+            tokens = limit
+            if row is not None:
+                tokens = min(limit, row[0] + (now - row[1]) * rate)
+            if tokens < 1:
+                wait_time = max(wait_time, (1 - tokens) / rate)
+            buckets.append((key, tokens - 1, limit, rate))
+
+        if wait_time:
+            if rule.block_time:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO blocked_users VALUES (?, ?)",
+                    (user_key, now + rule.block_time),
+                )
+                return rule.block_time
+            return max(math.ceil(wait_time), 1)
+
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+            [
+                # Bucket is full again, so no longer needed, once refilled
+                (key, tokens, now, now + (limit - tokens) / rate)
+                for key, tokens, limit, rate in buckets
+            ],
+        )
+        return 0
+
+    def _evict(self, now: float) -> None:
+        """Remove the buckets and blocks that are no longer in effect."""
+        self.connection.execute(
+            "DELETE FROM buckets WHERE expires_at <= ?",
+            (now,),
+        )
+        self.connection.execute(
+            "DELETE FROM blocked_users WHERE blocked_until <= ?",
+            (now,),
+        )
+        self.next_eviction = now + self.EVICTION_INTERVAL
+
+    def _hash(self, key: str) -> bytes:
+        """Shorten the key, since it may contain the whole token."""
+        return hashlib.sha256(key.encode()).digest()
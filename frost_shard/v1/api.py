@@ -1,23 +1,47 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from frost_shard.auth.dependencies import get_request_user, has_permissions
 from frost_shard.auth.enums import UserPermission
 from frost_shard.auth.models import RequestUserModel
 from frost_shard.database.models import FileSQLModel
 from frost_shard.domain.file_service import FileService
-from frost_shard.domain.filters import FileFilters, PaginationParams
-from frost_shard.domain.models import FileCreateModel
+from frost_shard.domain.filters import (
+    FileFilters,
+    PaginationParams,
+    StatsParams,
+)
+from frost_shard.domain.models import (
+    FileBatchCreateModel,
+    FileCreateModel,
+    FileResponseModel,
+    FileStatsModel,
+)
 from frost_shard.domain.permissions import validate_filters
-from frost_shard.v1.dependencies import get_file_service
+from frost_shard.settings import settings
+from frost_shard.utils.http import etag_matches
+from frost_shard.v1.dependencies import get_file_service, pin_to_primary
+from frost_shard.v1.responses import (
+    MSGPACK_MEDIA_TYPES,
+    NDJSON_MEDIA_TYPE,
+    RowsJSONResponse,
+    encode_rows,
+    get_stream_format,
+)
 
 router = APIRouter(tags=["v1"], prefix="/api/v1")
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 
 @router.post(
     "/files",
     status_code=status.HTTP_201_CREATED,
-    response_model=FileSQLModel,
-    dependencies=(Depends(has_permissions((UserPermission.CREATE_FILES,))),),
+    response_model=FileResponseModel,
+    dependencies=(
+        Depends(has_permissions((UserPermission.CREATE_FILES,))),
+        Depends(pin_to_primary),
+    ),
 )
 async def create_file(
     body: FileCreateModel,
@@ -36,29 +60,145 @@ async def create_file(
     return await file_service.create(user, body)
 
 
+@router.post(
+    "/files/batch",
+    status_code=status.HTTP_201_CREATED,
+    response_model=list[FileResponseModel],
+    dependencies=(
+        Depends(has_permissions((UserPermission.CREATE_FILES,))),
+        Depends(pin_to_primary),
+    ),
+)
+async def create_files(
+    body: FileBatchCreateModel,
+    user: RequestUserModel = Depends(get_request_user),
+    file_service: FileService[FileSQLModel] = Depends(get_file_service),
+) -> list[FileSQLModel]:
+    """Create a batch of new files at once.
+
+    Args:
+        body (FileBatchCreateModel): Data for the new files.
+        file_service (FileService): File service.
+
+    Returns:
+        list[FileSQLModel]: Created files.
+    """
+    return await file_service.create_many(user, body)
+
+
 @router.get(
     "/files",
     status_code=status.HTTP_200_OK,
-    response_model=list[FileSQLModel],
+    response_model=list[FileResponseModel],
+    responses={
+        status.HTTP_200_OK: {
+            "content": {
+                NDJSON_MEDIA_TYPE: {},
+                MSGPACK_MEDIA_TYPES[0]: {},
+            },
+        },
+    },
     dependencies=(
         Depends(has_permissions((UserPermission.READ_FILES,))),
         Depends(validate_filters),
     ),
 )
 async def get_files(
+    response: Response,
     user: RequestUserModel = Depends(get_request_user),
     file_service: FileService[FileSQLModel] = Depends(get_file_service),
     file_filters: FileFilters = Depends(),
     pagination: PaginationParams = Depends(),
-) -> list[FileSQLModel]:
+    if_none_match: str | None = Header(None),
+    accept: str | None = Header(None),
+) -> list[FileSQLModel] | Response:
     """Get all files based on provided filters.
 
+    The cursor of the next page is returned in the 'X-Next-Cursor' header
+    and can be passed back as the 'after' parameter. If the 'ETag' header
+    is passed back in 'If-None-Match' and no files were created since,
+    the files are not fetched again and 304 is returned instead. With
+    'FAST_SERIALIZATION', files skip the response model validation.
+
+    If NDJSON or MessagePack is accepted, all the files matching filters
+    are streamed in that format as they are fetched, without pagination.
+    Since the format depends on it, every response varies on 'Accept'.
+
     Args:
         file_service (FileService): File service.
         file_filters (FileFilters): File filters.
         pagination (PaginationParams): Pagination parameters.
+        if_none_match (str | None): ETag of the previous response.
+        accept (str | None): Accepted media types.
+
+    Returns:
+        list[FileSQLModel] | Response: List of files or other response.
+    """
+    response.headers["Vary"] = "Accept"
+    if (stream_format := get_stream_format(accept)) is not None:
+        media_type, dump_row = stream_format
+        return StreamingResponse(
+            encode_rows(
+                file_service.stream(user, file_filters),
+                FileResponseModel,
+                dump_row,
+                media_type,
+            ),
+            media_type=media_type,
+            headers=dict(response.headers),
+        )
+
+    etag = await file_service.get_etag(
+        user,
+        file_filters,
+        pagination,
+        JSONResponse.media_type,
+    )
+    if etag is not None:
+        if etag_matches(if_none_match, etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={**response.headers, "ETag": etag},
+            )
+        response.headers["ETag"] = etag
+
+    files = await file_service.collect(user, file_filters, pagination)
+    if next_cursor := file_service.get_next_cursor(files, pagination):
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if settings.FAST_SERIALIZATION:
+        return RowsJSONResponse(
+            files,
+            FileResponseModel,
+            headers=dict(response.headers),
+        )
+    return files
+
+
+@router.get(
+    "/files/stats",
+    status_code=status.HTTP_200_OK,
+    response_model=list[FileStatsModel],
+    dependencies=(
+        Depends(has_permissions((UserPermission.READ_FILES,))),
+        Depends(validate_filters),
+    ),
+)
+async def get_files_stats(
+    user: RequestUserModel = Depends(get_request_user),
+    file_service: FileService[FileSQLModel] = Depends(get_file_service),
+    file_filters: FileFilters = Depends(),
+    stats_params: StatsParams = Depends(),
+) -> list[FileStatsModel]:
+    """Get the number of files per period based on provided filters.
+
+    Periods without any files are left out.
+
+    Args:
+        file_service (FileService): File service.
+        file_filters (FileFilters): File filters.
+        stats_params (StatsParams): Statistics parameters.
 
     Returns:
-        list[FileSQLModel]: List of files.
+        list[FileStatsModel]: Number of files per period.
     """
-    return await file_service.collect(user, file_filters, pagination)
+    return await file_service.collect_stats(user, file_filters, stats_params)
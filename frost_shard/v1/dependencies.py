@@ -1,26 +1,135 @@
-from typing import TypeAlias
+import hashlib
+import hmac
+import os
+from functools import lru_cache
+from typing import Sequence, TypeAlias
 
-from fastapi import Depends
+from fastapi import Cookie, Depends, Response
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from frost_shard.database.connection import get_db_session
-from frost_shard.database.models import FileSQLModel
+from frost_shard.database.batching import BatchingRepository, WriteBatcher
+from frost_shard.database.connection import (
+    get_db_session,
+    get_primary_session_factory,
+    get_replica_db_session,
+)
+from frost_shard.database.models import (
+    FileDailyCountSQLModel,
+    FileOwnerCountSQLModel,
+    FileSQLModel,
+)
+from frost_shard.database.replicas import ReplicaPins, ReplicaRepository
+from frost_shard.database.rollups import CountRollup
 from frost_shard.database.sql_repository import SQLRepository
-from frost_shard.domain.crypto_service import CryptoService
+from frost_shard.domain.crypto_service import CryptoService, create_executor
 from frost_shard.domain.file_service import FileService
 from frost_shard.domain.models import FileEncryptedModel
+from frost_shard.domain.repository import Repository
 from frost_shard.settings import settings
 
 FileSQLRepository: TypeAlias = SQLRepository[FileSQLModel, FileEncryptedModel]
 
+REPLICA_PIN_COOKIE = "replica_pin"
+
+FILE_ROLLUPS = (
+    CountRollup(FileDailyCountSQLModel, ("email_hash", "date")),
+    CountRollup(FileOwnerCountSQLModel, ("email_hash",)),
+)
+
+
+@lru_cache(maxsize=1)
+def get_crypto_service() -> CryptoService:
+    """Prepare the crypto service with it's pool, shared by all requests."""
+    return CryptoService(
+        settings.SECRET_KEY,
+        settings.BLIND_INDEX_KEY,
+        previous_secrets=settings.PREVIOUS_SECRET_KEYS,
+        executor=create_executor(
+            settings.CRYPTO_EXECUTOR,
+            settings.CRYPTO_WORKERS,
+        ),
+        chunk_size=settings.CRYPTO_CHUNK_SIZE,
+        concurrency=settings.CRYPTO_WORKERS or os.cpu_count() or 1,
+    )
+
+
+def create_file_repository(session: AsyncSession) -> FileSQLRepository:
+    """Create the file repository working on the given session."""
+    repository: FileSQLRepository = SQLRepository(
+        FileSQLModel,
+        ordering=("date", "id"),
+        fetch_size=settings.DATABASE_FETCH_SIZE,
+        rollups=FILE_ROLLUPS,
+    )
+    repository.session = session
+    return repository
+
+
+@lru_cache(maxsize=1)
+def get_write_batcher() -> WriteBatcher[FileSQLModel, FileEncryptedModel]:
+    """Prepare the batcher for file creates, shared by all requests."""
+
+    async def create_many(
+        data: Sequence[FileEncryptedModel],
+    ) -> list[FileSQLModel]:
+        """Write the batch in a session of its own."""
+        async with get_primary_session_factory()() as session:
+            return await create_file_repository(session).create_many(data)
+
+    return WriteBatcher(
+        create_many,
+        max_delay=settings.WRITE_BATCH_MAX_DELAY_MS / 1000,
+        max_size=settings.WRITE_BATCH_MAX_SIZE,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_replica_pins() -> ReplicaPins | None:
+    """Prepare the pins of the clients to the primary after their writes."""
+    if not (
+        settings.DATABASE_REPLICA_URLS and settings.DATABASE_REPLICA_PIN_SECONDS
+    ):
+        return None
+    # Pins are signed with a key of their own, derived from the secret
+    key = hmac.new(
+        settings.SECRET_KEY.encode(),
+        b"replica-pin",
+        hashlib.sha256,
+    ).digest()
+    return ReplicaPins(key, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def pin_to_primary(response: Response) -> None:
+    """Keep the client on the primary for a while, to read its writes."""
+    if (pins := get_replica_pins()) is not None:
+        response.set_cookie(
+            REPLICA_PIN_COOKIE,
+            pins.create(),
+            max_age=pins.ttl,
+            httponly=True,
+            secure=not settings.DEBUG,
+            samesite="strict",
+        )
+
 
 def get_file_service(
     session: AsyncSession = Depends(get_db_session),
+    replica_session: AsyncSession | None = Depends(get_replica_db_session),
+    crypto_service: CryptoService = Depends(get_crypto_service),
+    replica_pin: str | None = Cookie(None, alias=REPLICA_PIN_COOKIE),
 ) -> FileService:
     """Initialize the file service with it's dependencies."""
-    repository: FileSQLRepository = SQLRepository(FileSQLModel)
-    repository.session = session
+    repository: Repository = create_file_repository(session)
+    if settings.WRITE_BATCH_ENABLED:
+        repository = BatchingRepository(repository, get_write_batcher())
+    pins = get_replica_pins()
+    pinned = pins is not None and pins.is_pinned(replica_pin)
+    if replica_session is not None and not pinned:
+        repository = ReplicaRepository(
+            repository,
+            create_file_repository(replica_session),
+        )
     return FileService(
         repository=repository,
-        crypto_service=CryptoService(settings.SECRET_KEY),
+        crypto_service=crypto_service,
     )
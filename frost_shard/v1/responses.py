@@ -0,0 +1,186 @@
+import datetime
+import json
+import operator
+import time
+import uuid
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Iterable
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from frost_shard.metrics import SERIALIZATION_SECONDS
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+RowDumper = Callable[[dict], bytes]
+RowEncoder = Callable[[Any], dict]
+
+ROW_ENCODERS: dict[type[BaseModel], RowEncoder] = {}
+
+
+def get_row_encoder(model: type[BaseModel]) -> RowEncoder:
+    """Get the function reading the model fields from a row.
+
+    The field layout is computed once per model, so every row is only
+    read, without building and validating the model for each of them.
+
+    Args:
+        model (type[BaseModel]): Model describing the output of the row.
+
+    Returns:
+        RowEncoder: Function returning the fields of the row.
+    """
+    if model not in ROW_ENCODERS:
+        ROW_ENCODERS[model] = create_row_encoder(model)
+    return ROW_ENCODERS[model]
+
+
+def create_row_encoder(model: type[BaseModel]) -> RowEncoder:
+    """Prepare a function reading the model fields from a row."""
+    names = tuple(model.__fields__)
+    if len(names) == 1:
+        return lambda row: {names[0]: getattr(row, names[0])}
+
+    get_values = operator.attrgetter(*names)
+    return lambda row: dict(zip(names, get_values(row)))
+
+
+def encode_default(value: Any) -> Any:
+    """Encode the values the encoders can't, the same way as pydantic does."""
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    raise TypeError(f"Type is not serializable: {type(value).__name__}")
+
+
+def get_ndjson_dumper() -> RowDumper:
+    """Prepare a function encoding a row as a line of JSON."""
+    try:
+        import orjson
+    except ImportError:  # pragma: no cover
+        dumps = partial(
+            json.dumps,
+            default=encode_default,
+            separators=(",", ":"),
+        )
+        return lambda row: dumps(row).encode() + b"\n"
+
+    return lambda row: orjson.dumps(
+        row,
+        default=encode_default,
+        option=orjson.OPT_APPEND_NEWLINE,
+    )
+
+
+def get_msgpack_dumper() -> RowDumper | None:
+    """Prepare a function encoding a row as a MessagePack map."""
+    try:
+        import msgpack  # type: ignore
+    except ImportError:  # pragma: no cover
+        return None
+
+    packer = msgpack.Packer(default=encode_default)
+    # Bytes have a type of their own in MessagePack, keep them as in JSON
+    return lambda row: packer.pack(
+        {
+            name: value.decode() if isinstance(value, bytes) else value
+            for name, value in row.items()
+        },
+    )
+
+
+def get_stream_format(accept: str | None) -> tuple[str, RowDumper] | None:
+    """Pick the first streaming format the client accepts.
+
+    Args:
+        accept (str | None): Value of the 'Accept' header.
+
+    Returns:
+        tuple[str, RowDumper] | None: Media type with the row encoding
+            function or None if no streaming format is accepted.
+    """
+    if accept is None:
+        return None
+    for media_range in accept.split(","):
+        media_type = media_range.split(";")[0].strip().lower()
+        if media_type == NDJSON_MEDIA_TYPE:
+            return media_type, get_ndjson_dumper()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            dump_row = get_msgpack_dumper()
+            if dump_row is not None:
+                return media_type, dump_row
+    return None
+
+
+async def encode_rows(
+    rows: AsyncIterator[Any],
+    model: type[BaseModel],
+    dump_row: RowDumper,
+    media_type: str,
+) -> AsyncIterator[bytes]:
+    """Encode the rows as they come, in chunks of similar size.
+
+    Only a single chunk is kept in memory at once, no matter how many
+    rows there are, while the rows are not sent one by one either. Time
+    spent encoding the rows is recorded once the stream is over, without
+    the time spent fetching them.
+
+    Args:
+        rows (AsyncIterator[Any]): Rows to encode.
+        model (type[BaseModel]): Model describing the output of the row.
+        dump_row (RowDumper): Function encoding a single row.
+        media_type (str): Media type the rows are encoded in.
+
+    Yields:
+        AsyncIterator[bytes]: Chunks of the encoded rows.
+    """
+    encode_row = get_row_encoder(model)
+    chunk = bytearray()
+    elapsed = 0.0
+    try:
+        async for row in rows:
+            start = time.perf_counter()
+            chunk += dump_row(encode_row(row))
+            elapsed += time.perf_counter() - start
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield bytes(chunk)
+                chunk.clear()
+        if chunk:
+            yield bytes(chunk)
+    finally:
+        SERIALIZATION_SECONDS.labels(media_type).observe(elapsed)
+
+
+class RowsJSONResponse(Response):
+    """JSON response rendering the rows straight away with orjson.
+
+    Output is the same as with the 'model' being the response model, but
+    skips the validation of every row and uses the faster encoder.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        rows: Iterable[Any],
+        model: type[BaseModel],
+        **options: Any,
+    ) -> None:
+        self.encode_row = get_row_encoder(model)
+        super().__init__(rows, **options)
+
+    def render(self, content: Iterable[Any]) -> bytes:
+        """Render the rows as a JSON list."""
+        import orjson
+
+        with SERIALIZATION_SECONDS.labels(self.media_type).time():
+            return orjson.dumps(
+                [self.encode_row(row) for row in content],
+                default=encode_default,
+            )
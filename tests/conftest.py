@@ -6,7 +6,6 @@ import pytest_asyncio
 from fastapi import FastAPI
 from httpx import AsyncClient
 from pydantic import EmailStr
-from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 
@@ -23,8 +22,8 @@ TEST_USER_EMAIL = "test@user.com"
 @pytest_asyncio.fixture()
 async def database_session() -> connection.SessionGenerator:
     """Prepare a test database session."""
-    engine_factory = create_async_engine(settings.DATABASE_URL)
-    session_factory = connection.get_session_factory(settings.DATABASE_URL)
+    engine_factory = connection.create_engine(settings.DATABASE_URL)
+    session_factory = connection.get_session_factory(engine_factory)
 
     async with engine_factory.begin() as engine:
         # Clear all the data and migrate the tables.
@@ -0,0 +1,181 @@
+import asyncio
+from typing import Sequence
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from structlog.testing import capture_logs
+
+from frost_shard import lifespan
+from frost_shard.database import connection
+from frost_shard.database.batching import WriteBatcher
+from frost_shard.database.instrumentation import StatementObserver
+from frost_shard.metrics import observe_pool
+from frost_shard.settings import settings
+from frost_shard.v1.dependencies import get_crypto_service
+
+pytestmark = pytest.mark.asyncio
+
+CHECKOUTS_METRIC = "frost_shard_db_pool_checkout_seconds_count"
+
+
+async def test_pool_metrics() -> None:
+    """Check that the pool exports its checkouts and usage."""
+    engine = connection.create_engine(settings.DATABASE_URL)
+    observe_pool(engine.sync_engine.pool)
+    checkouts = REGISTRY.get_sample_value(CHECKOUTS_METRIC)
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        assert REGISTRY.get_sample_value("frost_shard_db_pool_in_use") == 1
+        assert REGISTRY.get_sample_value("frost_shard_db_pool_overflow") == 0
+
+    assert REGISTRY.get_sample_value(CHECKOUTS_METRIC) == checkouts + 1
+    assert REGISTRY.get_sample_value("frost_shard_db_pool_in_use") == 0
+    await engine.dispose()
+
+
+async def test_statement_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that the statement timeout is applied to the connections."""
+    monkeypatch.setattr(settings, "DATABASE_STATEMENT_TIMEOUT", 1234)
+    engine = connection.create_engine(settings.DATABASE_URL)
+
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SHOW statement_timeout"))
+        assert result.scalar() == "1234ms"
+
+    await engine.dispose()
+
+
+async def test_slow_query_log(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that slow statements are logged with their plan, not values."""
+    monkeypatch.setattr(settings, "DATABASE_STATEMENT_METRICS", False)
+    monkeypatch.setattr(settings, "DATABASE_SLOW_QUERY_MS", 0)
+    engine = connection.create_engine(settings.DATABASE_URL)
+    StatementObserver(slow_query_seconds=0.01, explain=True).attach(engine)
+
+    with capture_logs() as logs:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(
+                text("SELECT pg_sleep(0.02), :secret AS secret"),
+                {"secret": "encrypted"},
+            )
+            # Transaction is still usable after the plan
+            await conn.execute(text("SELECT 1"))
+
+    slow_logs = [
+        log for log in logs if log["event"] == "Slow database statement"
+    ]
+    assert len(slow_logs) == 1
+    assert slow_logs[0]["statement"] == "SELECT pg_sleep(...), ? AS secret"
+    assert slow_logs[0]["parameters"] == ["str"]
+    assert slow_logs[0]["rows"] == 1
+    assert "encrypted" not in repr(slow_logs[0])
+    assert slow_logs[0]["plan"]["Plan"]["Node Type"] == "Result"
+    assert REGISTRY.get_sample_value(
+        "frost_shard_db_slow_statements_total",
+        {"fingerprint": slow_logs[0]["fingerprint"]},
+    )
+    await engine.dispose()
+
+
+async def test_slow_query_plan_leaves_out_values(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Check that the values in the conditions never reach the plan."""
+    monkeypatch.setattr(settings, "DATABASE_STATEMENT_METRICS", False)
+    monkeypatch.setattr(settings, "DATABASE_SLOW_QUERY_MS", 0)
+    engine = connection.create_engine(settings.DATABASE_URL)
+    StatementObserver(slow_query_seconds=0.01, explain=True).attach(engine)
+
+    with capture_logs() as logs:
+        async with engine.connect() as conn:
+            await conn.execute(
+                text("CREATE TEMP TABLE files (email_hash TEXT)"),
+            )
+            await conn.execute(text("INSERT INTO files VALUES ('blind-index')"))
+            await conn.execute(
+                text(
+                    "SELECT pg_sleep(0.02) FROM files "
+                    "WHERE email_hash = :value",
+                ),
+                {"value": "blind-index"},
+            )
+
+    slow_log = next(
+        log for log in logs if log["event"] == "Slow database statement"
+    )
+    assert slow_log["plan"]["Plan"]["Node Type"] == "Seq Scan"
+    assert slow_log["plan"]["Plan"]["Relation Name"] == "files"
+    assert "Actual Total Time" in slow_log["plan"]["Plan"]
+    assert "blind-index" not in repr(slow_log)
+    await engine.dispose()
+
+
+async def test_slow_query_plan_in_autocommit(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Check that the statement succeeds when the plan can't be made."""
+    monkeypatch.setattr(settings, "DATABASE_STATEMENT_METRICS", False)
+    monkeypatch.setattr(settings, "DATABASE_SLOW_QUERY_MS", 0)
+    engine = connection.create_engine(settings.DATABASE_URL)
+    StatementObserver(slow_query_seconds=0.01, explain=True).attach(engine)
+
+    with capture_logs() as logs:
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            result = await conn.execute(text("SELECT pg_sleep(0.02), 1"))
+            assert result.one()[1] == 1
+
+    slow_log = next(
+        log for log in logs if log["event"] == "Slow database statement"
+    )
+    assert slow_log["plan"] is None
+    await engine.dispose()
+
+
+async def test_prewarm_pool() -> None:
+    """Check that the connections are opened up to the pool size."""
+    engine = connection.create_engine(settings.DATABASE_URL)
+
+    await connection.prewarm_pool(engine, settings.DATABASE_POOL_SIZE + 1)
+
+    assert engine.sync_engine.pool.checkedin() == settings.DATABASE_POOL_SIZE
+    await engine.dispose()
+
+
+async def test_warm_up() -> None:
+    """Check that the app pool is filled on startup and closed on shutdown."""
+    pool = connection.get_engine().sync_engine.pool
+
+    await lifespan.warm_up()
+    crypto_service = get_crypto_service()
+    assert pool.checkedin() == settings.DATABASE_POOL_PREWARM
+
+    await lifespan.shut_down()
+    assert pool.checkedin() == 0
+    # Crypto pool is stopped, so the next service gets a new one
+    assert get_crypto_service() is not crypto_service
+
+
+async def test_shut_down_writes_batched_entries(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Check that the pending batched writes are written on shutdown."""
+    written: list[str] = []
+
+    async def create_many(data: Sequence[str]) -> list[str]:
+        written.extend(data)
+        return list(data)
+
+    batcher = WriteBatcher(create_many, max_delay=60, max_size=10)
+    monkeypatch.setattr(settings, "WRITE_BATCH_ENABLED", True)
+    monkeypatch.setattr(lifespan, "get_write_batcher", lambda: batcher)
+    pending = asyncio.create_task(batcher.create("entry"))
+    await asyncio.sleep(0)
+
+    await asyncio.wait_for(lifespan.shut_down(), timeout=1)
+
+    assert written == ["entry"]
+    assert await pending == "entry"
@@ -0,0 +1,61 @@
+import datetime
+
+import pytest
+from pydantic import EmailStr
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from frost_shard.auth.enums import UserPermission, UserRole
+from frost_shard.auth.models import RequestUserModel
+from frost_shard.database.models import FileSQLModel
+from frost_shard.database.sql_repository import SQLRepository
+from frost_shard.domain.crypto_service import CryptoService
+from frost_shard.domain.file_service import FileService
+from frost_shard.domain.filters import FileFilters
+from frost_shard.domain.models import FileCreateModel
+from frost_shard.settings import settings
+from tests.conftest import TEST_USER_EMAIL
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture()
+def file_service(database_session: AsyncSession) -> FileService:
+    """Prepare the file service streaming two rows at a time."""
+    repository = SQLRepository(
+        FileSQLModel,
+        ordering=("date", "id"),
+        fetch_size=2,
+    )
+    repository.session = database_session
+    return FileService(
+        repository=repository,
+        crypto_service=CryptoService(
+            settings.SECRET_KEY,
+            settings.BLIND_INDEX_KEY,
+        ),
+    )
+
+
+@pytest.fixture()
+def user() -> RequestUserModel:
+    """Prepare the user owning the files."""
+    return RequestUserModel(
+        email=EmailStr(TEST_USER_EMAIL),
+        roles={UserRole.REGULAR},
+        permissions={UserPermission.READ_FILES, UserPermission.CREATE_FILES},
+    )
+
+
+async def test_stream_files(
+    file_service: FileService,
+    user: RequestUserModel,
+) -> None:
+    """Check that streaming goes through all the files in order."""
+    dates = [datetime.date(2020, 1, day) for day in range(5, 0, -1)]
+    for date in dates:
+        await file_service.create(user, FileCreateModel(date=date))
+
+    filters = FileFilters(email=None, date__gt=None, date__lt=None)
+    files = [file async for file in file_service.stream(user, filters)]
+
+    assert [file.date for file in files] == sorted(dates)
@@ -1,32 +1,67 @@
 import datetime
+import json
 from typing import Callable
 
 import pytest
-from fastapi import status
+from fastapi import FastAPI, status
 from httpx import AsyncClient
+from prometheus_client import REGISTRY
 from pydantic import EmailStr
+from sqlalchemy import update
+from sqlmodel import col
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from frost_shard.auth.enums import UserPermission, UserRole
 from frost_shard.auth.models import RequestUserModel
+from frost_shard.database import connection
+from frost_shard.database.models import FileSQLModel
 from frost_shard.domain.crypto_service import CryptoService
 from frost_shard.settings import settings
+from frost_shard.v1.api import NEXT_CURSOR_HEADER
+from frost_shard.v1.dependencies import REPLICA_PIN_COOKIE, get_replica_pins
 from tests.conftest import TEST_USER_EMAIL
 
 pytestmark = pytest.mark.asyncio
 
 FILES_ROUTE = "/api/v1/files"
+STATS_ROUTE = f"{FILES_ROUTE}/stats"
+ROWS_METRIC = "frost_shard_repository_rows_total"
 
 
 async def test_files_create_api(http_client: AsyncClient) -> None:
     """Check that create endpoint is responding with created file."""
     response = await http_client.post(FILES_ROUTE, json={})
     data = response.json()
-    crypto = CryptoService(settings.SECRET_KEY)
+    crypto = CryptoService(settings.SECRET_KEY, settings.BLIND_INDEX_KEY)
 
     assert response.status_code == status.HTTP_201_CREATED
     assert data["id"] is not None
     assert crypto.decrypt(data["email"].encode()).decode() == TEST_USER_EMAIL
     assert data["date"] == str(datetime.date.today())
+    assert "email_hash" not in data
+
+
+async def test_files_create_api_pins_to_primary(
+    http_client: AsyncClient,
+    test_app: FastAPI,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Check that the writer gets a pin to read its files from the primary."""
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", ["replica"])
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 5)
+    test_app.dependency_overrides[
+        connection.get_replica_db_session
+    ] = lambda: None
+    get_replica_pins.cache_clear()
+
+    response = await http_client.post(FILES_ROUTE, json={})
+    pins = get_replica_pins()
+    del test_app.dependency_overrides[connection.get_replica_db_session]
+    get_replica_pins.cache_clear()
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert pins is not None
+    assert pins.is_pinned(response.cookies[REPLICA_PIN_COOKIE])
 
 
 async def test_empty_files_list_api(http_client: AsyncClient) -> None:
@@ -124,3 +159,295 @@ async def test_files_list_api_with_non_admin_filter(
 
     assert response.status_code == status.HTTP_403_FORBIDDEN
     assert data["detail"] == "User is not allowed to perform this action"
+
+
+async def test_files_list_api_with_cursor_pagination(
+    http_client: AsyncClient,
+) -> None:
+    """Check that files can be listed page by page with the next cursor."""
+    # Create 5 files with different dates using API
+    for number in range(1, 6):
+        await http_client.post(
+            FILES_ROUTE,
+            json={"date": f"2020-01-0{number}"},
+        )
+
+    dates = []
+    params: dict = {"limit": 2}
+    while True:
+        response = await http_client.get(FILES_ROUTE, params=params)
+        assert response.status_code == status.HTTP_200_OK
+        dates.extend(file["date"] for file in response.json())
+        if NEXT_CURSOR_HEADER not in response.headers:
+            break
+        params["after"] = response.headers[NEXT_CURSOR_HEADER]
+
+    assert dates == [f"2020-01-0{number}" for number in range(1, 6)]
+
+
+async def test_files_list_api_with_cursor_pagination_over_null_dates(
+    http_client: AsyncClient,
+    database_session: AsyncSession,
+) -> None:
+    """Check that files without a date are listed last, page by page."""
+    await http_client.post(
+        f"{FILES_ROUTE}/batch",
+        json=[{"date": f"2020-01-0{number}"} for number in range(1, 6)],
+    )
+    # New files always get a date, but the older ones might not have it
+    await database_session.execute(
+        update(FileSQLModel)
+        .where(col(FileSQLModel.date) != datetime.date(2020, 1, 1))
+        .where(col(FileSQLModel.date) != datetime.date(2020, 1, 3))
+        .values(date=None),
+    )
+
+    files = []
+    params: dict = {"limit": 2}
+    while True:
+        response = await http_client.get(FILES_ROUTE, params=params)
+        assert response.status_code == status.HTTP_200_OK
+        files.extend(response.json())
+        if NEXT_CURSOR_HEADER not in response.headers:
+            break
+        params["after"] = response.headers[NEXT_CURSOR_HEADER]
+
+    # Second page ends with a file without a date
+    assert [file["date"] for file in files] == [
+        "2020-01-01",
+        "2020-01-03",
+        None,
+        None,
+        None,
+    ]
+    assert len({file["id"] for file in files}) == 5
+
+
+async def test_files_list_api_with_invalid_cursor(
+    http_client: AsyncClient,
+) -> None:
+    """Check that malformed cursor is rejected with 400."""
+    response = await http_client.get(f"{FILES_ROUTE}?after=invalid")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Invalid pagination cursor"
+
+
+async def test_files_batch_create_api(http_client: AsyncClient) -> None:
+    """Check that batch create endpoint is responding with created files."""
+    response = await http_client.post(
+        f"{FILES_ROUTE}/batch",
+        json=[{"date": "2020-01-01"}, {"date": "2020-01-02"}, {}],
+    )
+    data = response.json()
+    crypto = CryptoService(settings.SECRET_KEY, settings.BLIND_INDEX_KEY)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [file["date"] for file in data] == [
+        "2020-01-01",
+        "2020-01-02",
+        str(datetime.date.today()),
+    ]
+    assert len({file["email"] for file in data}) == 3
+    for file in data:
+        assert (
+            crypto.decrypt(file["email"].encode()).decode() == TEST_USER_EMAIL
+        )
+
+    response = await http_client.get(FILES_ROUTE)
+    assert len(response.json()) == 3
+
+
+async def test_files_batch_create_api_with_too_many_files(
+    http_client: AsyncClient,
+) -> None:
+    """Check that batches over the limit are rejected."""
+    response = await http_client.post(
+        f"{FILES_ROUTE}/batch",
+        json=[{}] * (settings.FILES_BATCH_MAX_SIZE + 1),
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_files_stats_api(http_client: AsyncClient) -> None:
+    """Check that stats endpoint is counting files per period."""
+    dates = ["2020-01-01", "2020-01-01", "2020-01-02", "2020-01-15"]
+    await http_client.post(
+        f"{FILES_ROUTE}/batch",
+        json=[{"date": date} for date in dates],
+    )
+
+    response = await http_client.get(
+        f"{STATS_ROUTE}?email={TEST_USER_EMAIL}&date__lt=2020-01-15",
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [
+        {"period_start": "2020-01-01", "count": 2},
+        {"period_start": "2020-01-02", "count": 1},
+    ]
+
+    response = await http_client.get(
+        f"{STATS_ROUTE}?email={TEST_USER_EMAIL}&period=month",
+    )
+
+    assert response.json() == [{"period_start": "2020-01-01", "count": 4}]
+
+
+async def test_files_stats_api_with_non_admin_filter(
+    get_http_client: Callable[..., AsyncClient],
+) -> None:
+    """Check that counting other users files with non-admin users returns 403."""
+    regular_client = get_http_client(
+        user=RequestUserModel(
+            email=EmailStr("test-regular@email.com"),
+            roles={UserRole.REGULAR},
+            permissions={UserPermission.READ_FILES},
+        )
+    )
+    response = await regular_client.get(
+        f"{STATS_ROUTE}?email=test-admin@email.com",
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+async def test_files_list_api_with_etag(http_client: AsyncClient) -> None:
+    """Check that listing is not repeated until the owner writes a file."""
+    await http_client.post(FILES_ROUTE, json={})
+    url = f"{FILES_ROUTE}?email={TEST_USER_EMAIL}"
+
+    response = await http_client.get(url)
+    etag = response.headers["ETag"]
+
+    assert response.status_code == status.HTTP_200_OK
+    assert etag.startswith('W/"')
+    assert response.headers["Vary"] == "Accept"
+
+    response = await http_client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.headers["Vary"] == "Accept"
+    assert not response.content
+
+    # Different parameters get a different tag
+    response = await http_client.get(
+        f"{url}&limit=1",
+        headers={"If-None-Match": etag},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+    await http_client.post(FILES_ROUTE, json={})
+    response = await http_client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 2
+
+
+async def test_files_list_api_with_fast_serialization(
+    http_client: AsyncClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Check that the fast serialization returns the same response."""
+    pytest.importorskip("orjson")
+    for number in range(1, 4):
+        await http_client.post(FILES_ROUTE, json={"date": f"2020-01-0{number}"})
+    url = f"{FILES_ROUTE}?email={TEST_USER_EMAIL}&limit=2"
+
+    response = await http_client.get(url)
+    monkeypatch.setattr(settings, "FAST_SERIALIZATION", True)
+    fast_response = await http_client.get(url)
+
+    assert fast_response.status_code == status.HTTP_200_OK
+    assert fast_response.json() == response.json()
+    assert fast_response.headers["content-type"] == "application/json"
+    assert fast_response.headers[NEXT_CURSOR_HEADER]
+    assert fast_response.headers["ETag"] == response.headers["ETag"]
+    assert fast_response.headers["Vary"] == "Accept"
+
+
+async def test_files_list_api_with_ndjson_stream(
+    http_client: AsyncClient,
+) -> None:
+    """Check that all the files are streamed as lines of JSON."""
+    await http_client.post(
+        f"{FILES_ROUTE}/batch",
+        json=[{"date": f"2020-01-{day:02}"} for day in range(1, 21)],
+    )
+    url = f"{FILES_ROUTE}?email={TEST_USER_EMAIL}"
+
+    response = await http_client.get(url, params={"limit": 100})
+    stream_response = await http_client.get(
+        url,
+        headers={"Accept": "application/x-ndjson"},
+    )
+    lines = stream_response.content.decode().splitlines()
+
+    assert stream_response.status_code == status.HTTP_200_OK
+    assert stream_response.headers["content-type"] == "application/x-ndjson"
+    assert stream_response.headers["Vary"] == "Accept"
+    # Pagination doesn't apply, all the files are streamed
+    assert [json.loads(line) for line in lines] == response.json()
+
+
+async def test_files_list_api_with_msgpack_stream(
+    http_client: AsyncClient,
+) -> None:
+    """Check that all the files are streamed as MessagePack maps."""
+    msgpack = pytest.importorskip("msgpack")
+    await http_client.post(
+        f"{FILES_ROUTE}/batch",
+        json=[{"date": f"2020-01-{day:02}"} for day in range(1, 21)],
+    )
+    url = f"{FILES_ROUTE}?email={TEST_USER_EMAIL}"
+
+    response = await http_client.get(url, params={"limit": 100})
+    stream_response = await http_client.get(
+        url,
+        headers={"Accept": "application/msgpack"},
+    )
+    unpacker = msgpack.Unpacker()
+    unpacker.feed(stream_response.content)
+
+    assert stream_response.headers["content-type"] == "application/msgpack"
+    assert list(unpacker) == response.json()
+
+
+async def test_files_list_api_metrics(http_client: AsyncClient) -> None:
+    """Check that the rows skipped by the page offset count as scanned."""
+    await http_client.post(
+        f"{FILES_ROUTE}/batch",
+        json=[{"date": f"2020-01-0{day}"} for day in range(1, 6)],
+    )
+    kinds = ("scanned", "returned")
+    before = {
+        kind: REGISTRY.get_sample_value(
+            ROWS_METRIC,
+            {"operation": "collect", "kind": kind},
+        )
+        or 0
+        for kind in kinds
+    }
+
+    response = await http_client.get(
+        FILES_ROUTE,
+        params={"page": 1, "limit": 2},
+    )
+    rows = {
+        kind: REGISTRY.get_sample_value(
+            ROWS_METRIC,
+            {"operation": "collect", "kind": kind},
+        )
+        for kind in kinds
+    }
+
+    assert len(response.json()) == 2
+    assert rows == {
+        "scanned": before["scanned"] + 4,
+        "returned": before["returned"] + 2,
+    }
@@ -1,8 +1,15 @@
+import asyncio
+from typing import Callable
+
 import pytest
 from fastapi import status
 from httpx import AsyncClient
+from pydantic import EmailStr
 
+from frost_shard.auth.enums import UserPermission, UserRole
+from frost_shard.auth.models import RequestUserModel
 from frost_shard.settings import settings
+from tests.conftest import TEST_USER_EMAIL
 
 pytestmark = [pytest.mark.asyncio]
 
@@ -25,3 +32,60 @@ async def test_healthcheck_endpoint(http_client: AsyncClient) -> None:
 
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["detail"] == "Ok"
+
+
+async def test_profile_endpoint(http_client: AsyncClient) -> None:
+    """Check that profile endpoint is returning the collapsed stacks."""
+    response = await http_client.get("/profile", params={"seconds": 0.1})
+    lines = response.text.splitlines()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert lines
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+async def test_profile_endpoint_speedscope(http_client: AsyncClient) -> None:
+    """Check that profile endpoint is returning the speedscope profile."""
+    response = await http_client.get(
+        "/profile",
+        params={"seconds": 0.1, "format": "speedscope"},
+    )
+    data = response.json()
+    frames = data["shared"]["frames"]
+    (profile,) = data["profiles"]
+
+    assert response.status_code == status.HTTP_200_OK
+    assert profile["type"] == "sampled"
+    assert len(profile["samples"]) == len(profile["weights"])
+    assert all(
+        index < len(frames) for sample in profile["samples"] for index in sample
+    )
+
+
+async def test_profile_endpoint_single_capture(
+    http_client: AsyncClient,
+) -> None:
+    """Check that only a single profile is captured at once."""
+    responses = await asyncio.gather(
+        http_client.get("/profile", params={"seconds": 0.2}),
+        http_client.get("/profile", params={"seconds": 0.2}),
+    )
+    status_codes = sorted(response.status_code for response in responses)
+
+    assert status_codes == [status.HTTP_200_OK, status.HTTP_409_CONFLICT]
+
+
+async def test_profile_endpoint_not_admin(
+    get_http_client: Callable[..., AsyncClient],
+) -> None:
+    """Check that only admins are allowed to profile."""
+    http_client = get_http_client(
+        user=RequestUserModel(
+            email=EmailStr(TEST_USER_EMAIL),
+            roles={UserRole.REGULAR},
+            permissions={permission.value for permission in UserPermission},
+        ),
+    )
+    response = await http_client.get("/profile", params={"seconds": 0.1})
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
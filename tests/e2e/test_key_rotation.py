@@ -0,0 +1,65 @@
+import contextlib
+from pathlib import Path
+from typing import AsyncIterator
+
+import pytest
+from cryptography.fernet import Fernet, InvalidToken
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from frost_shard.database.models import FileSQLModel
+from frost_shard.database.rotation import KeyRotationWorker
+from frost_shard.domain.crypto_service import CryptoService
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_rotate_keys(
+    database_session: AsyncSession,
+    tmp_path: Path,
+) -> None:
+    """Check that all the files are re-encrypted with the new key."""
+    old_secret = Fernet.generate_key().decode()
+    new_secret = Fernet.generate_key().decode()
+    old_crypto = CryptoService(old_secret, index_key="index-key")
+    for number in range(5):
+        email = f"test{number}@user.com".encode()
+        database_session.add(
+            FileSQLModel(
+                email=old_crypto.encrypt(email),
+                email_hash=old_crypto.digest(email),
+            ),
+        )
+    await database_session.commit()
+
+    @contextlib.asynccontextmanager
+    async def session_factory() -> AsyncIterator[AsyncSession]:
+        yield database_session
+
+    rotating_crypto = CryptoService(
+        new_secret,
+        index_key="index-key",
+        previous_secrets=[old_secret],
+    )
+    worker = KeyRotationWorker(
+        session_factory,
+        rotating_crypto,
+        batch_size=2,
+        rows_per_second=10_000,
+        checkpoint=tmp_path / "checkpoint",
+    )
+    assert await worker.run() == 5
+    assert not (tmp_path / "checkpoint").exists()
+
+    database_session.expire_all()
+    files = (await database_session.exec(select(FileSQLModel))).all()
+    new_fernet = Fernet(new_secret)
+    assert sorted(new_fernet.decrypt(file.email) for file in files) == [
+        f"test{number}@user.com".encode() for number in range(5)
+    ]
+    with pytest.raises(InvalidToken):
+        Fernet(old_secret).decrypt(files[0].email)
+    # Blind index doesn't depend on the secret keys
+    assert rotating_crypto.digest(b"test0@user.com") == old_crypto.digest(
+        b"test0@user.com",
+    )
@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+from sqlmodel import delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from frost_shard.database.models import FileDailyCountSQLModel, FileSQLModel
+from frost_shard.domain.models import FileEncryptedModel
+from frost_shard.v1.dependencies import FILE_ROLLUPS, create_file_repository
+
+pytestmark = pytest.mark.asyncio
+
+JANUARY_1 = datetime.date(2020, 1, 1)
+JANUARY_2 = datetime.date(2020, 1, 2)
+
+
+async def get_daily_counts(session: AsyncSession) -> set[tuple]:
+    """Collect the daily counts as tuples."""
+    result = await session.exec(select(FileDailyCountSQLModel))  # type: ignore
+    return {
+        (count.email_hash, count.date, count.count) for count in result.all()
+    }
+
+
+async def test_rollup_is_updated_on_create(
+    database_session: AsyncSession,
+) -> None:
+    """Check that the daily counts are incremented with every write."""
+    repository = create_file_repository(database_session)
+    await repository.create_many(
+        [
+            FileEncryptedModel(email=b"a", email_hash=b"a", date=JANUARY_1),
+            FileEncryptedModel(email=b"a", email_hash=b"a", date=JANUARY_1),
+            FileEncryptedModel(email=b"b", email_hash=b"b", date=JANUARY_2),
+        ],
+    )
+    await repository.create(
+        FileEncryptedModel(email=b"a", email_hash=b"a", date=JANUARY_1),
+    )
+
+    assert await get_daily_counts(database_session) == {
+        (b"a", JANUARY_1, 3),
+        (b"b", JANUARY_2, 1),
+    }
+    assert await repository.count(
+        group_by="date",
+        period="month",
+        email_hash=b"a",
+    ) == [(JANUARY_1, 3)]
+
+
+async def test_rollup_rebuild(database_session: AsyncSession) -> None:
+    """Check that the daily counts can be recounted from the files."""
+    for date in (JANUARY_1, JANUARY_1, JANUARY_2):
+        database_session.add(
+            FileSQLModel(email=b"a", email_hash=b"a", date=date),
+        )
+    await database_session.commit()
+    await database_session.exec(delete(FileDailyCountSQLModel))  # type: ignore
+
+    for rollup in FILE_ROLLUPS:
+        for statement in rollup.rebuild(FileSQLModel):
+            await database_session.execute(statement)
+    await database_session.commit()
+
+    assert await get_daily_counts(database_session) == {
+        (b"a", JANUARY_1, 2),
+        (b"a", JANUARY_2, 1),
+    }
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import time
+from unittest import mock
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import FastAPI
+from httpx import Response
+from jwt.algorithms import RSAAlgorithm
+from prometheus_client import REGISTRY
+from pydantic import ValidationError
+from structlog.testing import capture_logs
+
+from frost_shard.auth.exceptions import AuthenticationError
+from frost_shard.auth.models import AuthConfig
+from frost_shard.auth.services import (
+    AuthRoutingService,
+    AuthService,
+    TokenService,
+)
+from frost_shard.bootstrap import add_jwks_refresher
+from frost_shard.settings import Settings, settings
+from frost_shard.utils.cache import LRUCache
+
+pytestmark = pytest.mark.asyncio
+
+CUSTOM_CLAIM = "https://frost-shard/claims"
+VERIFY_METRIC = "frost_shard_auth_token_verify_seconds_count"
+
+
+class FakeHttpService:
+    """HTTP service serving the JWKs of the given keys."""
+
+    def __init__(self, *keys: rsa.RSAPrivateKey) -> None:
+        self.keys = list(keys)
+        self.calls = 0
+
+    async def request(self, method: str, url: str, **options) -> Response:
+        self.calls += 1
+        jwks = [
+            {
+                **json.loads(RSAAlgorithm.to_jwk(key.public_key())),
+                "kid": str(kid),
+            }
+            for kid, key in enumerate(self.keys)
+        ]
+        return Response(200, json={"keys": jwks})
+
+
+@pytest.fixture()
+def config() -> AuthConfig:
+    """Prepare the auth config for the fake auth domain."""
+    return AuthConfig(
+        auth_domain="auth.test",
+        audience="frost-shard",
+        algorithms=["RS256"],
+        custom_claim=CUSTOM_CLAIM,
+    )
+
+
+@pytest.fixture()
+def private_key() -> rsa.RSAPrivateKey:
+    """Generate the key signing the tokens."""
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def create_token(
+    config: AuthConfig,
+    private_key: rsa.RSAPrivateKey,
+    expires_in: int = 60,
+) -> str:
+    """Create the token signed with the given key."""
+    claims = {
+        "iss": config.base_auth_url,
+        "aud": config.audience,
+        "exp": int(time.time()) + expires_in,
+        "permissions": ["read:files"],
+        CUSTOM_CLAIM: {"email": "test@user.com", "roles": ["regular"]},
+    }
+    return jwt.encode(claims, private_key, "RS256", headers={"kid": "0"})
+
+
+def create_auth_service(
+    config: AuthConfig,
+    http_service: FakeHttpService,
+) -> AuthService:
+    """Create the auth service with the token cache."""
+    return AuthService(
+        routing_service=AuthRoutingService(config),
+        token_service=TokenService(config, http_service),  # type: ignore
+        verified_tokens=LRUCache(max_size=100_000),
+    )
+
+
+async def test_verified_tokens_are_cached(
+    config: AuthConfig,
+    private_key: rsa.RSAPrivateKey,
+) -> None:
+    """Check that the same token is verified only once."""
+    auth_service = create_auth_service(config, FakeHttpService(private_key))
+    token = create_token(config, private_key)
+
+    with mock.patch.object(
+        auth_service.token_service,
+        "decode_jwt_token",
+        wraps=auth_service.token_service.decode_jwt_token,
+    ) as decode_jwt_token:
+        first_user = await auth_service.get_request_user(token)
+        second_user = await auth_service.get_request_user(token)
+
+    assert decode_jwt_token.call_count == 1
+    assert first_user.email == "test@user.com"
+    assert second_user is first_user
+
+
+async def test_verified_tokens_are_dropped_on_new_keys(
+    config: AuthConfig,
+    private_key: rsa.RSAPrivateKey,
+) -> None:
+    """Check that the cached tokens are dropped when the JWKs change."""
+    http_service = FakeHttpService(private_key)
+    auth_service = create_auth_service(config, http_service)
+    await auth_service.get_request_user(create_token(config, private_key))
+    assert len(auth_service.verified_tokens) == 1
+
+    # Rotate the keys and make the service fetch them again
+    http_service.keys.append(
+        rsa.generate_private_key(public_exponent=65537, key_size=2048),
+    )
+    await auth_service.token_service.refresh_jwks()
+    await auth_service.get_request_user(
+        create_token(config, private_key, expires_in=120),
+    )
+
+    assert len(auth_service.verified_tokens) == 1
+
+
+async def test_concurrent_refreshes_share_a_request(
+    config: AuthConfig,
+    private_key: rsa.RSAPrivateKey,
+) -> None:
+    """Check that concurrent requests wait for a single JWKs fetch."""
+    http_service = FakeHttpService(private_key)
+    token_service = TokenService(config, http_service)  # type: ignore
+    token = create_token(config, private_key)
+
+    await asyncio.gather(
+        *(token_service.decode_jwt_token(token) for _ in range(10)),
+    )
+
+    assert http_service.calls == 1
+    assert list(token_service.public_keys) == ["0"]
+
+
+async def test_unknown_kids_are_not_fetched_again(
+    config: AuthConfig,
+    private_key: rsa.RSAPrivateKey,
+) -> None:
+    """Check that unknown key IDs hit the auth API once per cooldown."""
+    http_service = FakeHttpService(private_key)
+    token_service = TokenService(config, http_service)  # type: ignore
+    token = jwt.encode({}, private_key, "RS256", headers={"kid": "unknown"})
+
+    for _ in range(3):
+        with pytest.raises(jwt.InvalidTokenError):
+            await token_service.decode_jwt_token(token)
+
+    # One fetch for the missing keys and one for the unknown key ID
+    assert http_service.calls == 2
+
+
+async def test_random_kids_share_the_cooldown(
+    config: AuthConfig,
+    private_key: rsa.RSAPrivateKey,
+) -> None:
+    """Check that distinct unknown key IDs can't flood the auth API."""
+    http_service = FakeHttpService(private_key)
+    token_service = TokenService(config, http_service)  # type: ignore
+    await token_service.refresh_jwks()
+    tokens = [
+        jwt.encode({}, private_key, "RS256", headers={"kid": f"random{kid}"})
+        for kid in range(100)
+    ]
+
+    results = await asyncio.gather(
+        *(token_service.decode_jwt_token(token) for token in tokens[:50]),
+        return_exceptions=True,
+    )
+    for token in tokens[50:]:
+        with pytest.raises(jwt.InvalidTokenError):
+            await token_service.decode_jwt_token(token)
+
+    assert all(isinstance(result, jwt.InvalidTokenError) for result in results)
+    # One fetch for the keys and one for all the unknown key IDs
+    assert http_service.calls == 2
+
+
+async def test_jwks_refresher(
+    config: AuthConfig,
+    private_key: rsa.RSAPrivateKey,
+) -> None:
+    """Check that the background refresher fetches the keys."""
+    http_service = FakeHttpService(private_key)
+    token_service = TokenService(config, http_service)  # type: ignore
+
+    token_service.start_jwks_refresher()
+    await asyncio.sleep(0.01)
+    await token_service.stop_jwks_refresher()
+
+    assert http_service.calls == 1
+    assert "0" in token_service.public_keys
+
+
+async def test_token_verification_metrics(
+    config: AuthConfig,
+    private_key: rsa.RSAPrivateKey,
+) -> None:
+    """Check that the verifications are recorded by the result."""
+    auth_service = create_auth_service(config, FakeHttpService(private_key))
+    token = create_token(config, private_key)
+    results = ("verified", "cached", "rejected")
+    before = {
+        result: REGISTRY.get_sample_value(VERIFY_METRIC, {"result": result})
+        or 0
+        for result in results
+    }
+
+    await auth_service.get_request_user(token)
+    await auth_service.get_request_user(token)
+    with pytest.raises(AuthenticationError):
+        await auth_service.get_request_user(token[:-4])
+
+    for result in results:
+        count = REGISTRY.get_sample_value(VERIFY_METRIC, {"result": result})
+        assert count == before[result] + 1
+
+
+async def test_auth_scheme_without_tls(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that only HTTP(S) is accepted, and HTTP is warned about."""
+    monkeypatch.setattr(settings, "AUTH_SCHEME", "http")
+
+    with capture_logs() as logs:
+        add_jwks_refresher(FastAPI())
+
+    assert logs[0]["event"] == "Fetching the JWKs without TLS"
+    with pytest.raises(ValidationError):
+        Settings(AUTH_SCHEME="ftp")
@@ -0,0 +1,64 @@
+from frost_shard.utils.cache import LRUCache
+
+
+class FakeClock:
+    """Clock moved forward by hand."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    """Check that the cache stays within its size limit."""
+    # Every key and value takes a single unit of the size
+    cache: LRUCache[str, int] = LRUCache(max_size=6, sizeof=lambda _: 1)
+    for number in range(3):
+        cache.set(str(number), number)
+    # Use the oldest entry, so the second one is evicted instead
+    assert cache.get("0") == 0
+    cache.set("3", 3)
+
+    assert cache.size == 6
+    assert cache.get("1") is None
+    assert [cache.get(key) for key in ("0", "2", "3")] == [0, 2, 3]
+
+
+def test_cache_skips_values_over_the_limit() -> None:
+    """Check that a single big value doesn't flush the whole cache."""
+    cache: LRUCache[str, bytes] = LRUCache(max_size=10, sizeof=len)
+    cache.set("a", b"1234")
+    cache.set("b", b"12345678910")
+
+    assert cache.get("a") == b"1234"
+    assert cache.get("b") is None
+
+
+def test_cache_expires_entries() -> None:
+    """Check that entries are dropped after their ttl."""
+    clock = FakeClock()
+    cache: LRUCache[str, int] = LRUCache(max_size=1000, ttl=10, clock=clock)
+    cache.set("default", 1)
+    cache.set("short", 2, ttl=1)
+
+    clock.now = 5
+    assert cache.get("default") == 1
+    assert cache.get("short") is None
+
+    clock.now = 10
+    assert cache.get("default") is None
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_cache_counts_hits_and_misses() -> None:
+    """Check that the hit and miss counters are updated."""
+    cache: LRUCache[str, int] = LRUCache(max_size=1000)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+
+    assert (cache.hits, cache.misses) == (2, 1)
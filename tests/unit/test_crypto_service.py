@@ -0,0 +1,119 @@
+import itertools
+
+import pytest
+from cryptography.fernet import Fernet
+from prometheus_client import REGISTRY
+from pydantic import ValidationError
+
+from frost_shard.domain.crypto_service import CryptoService, create_executor
+from frost_shard.settings import Settings
+
+MESSAGES_METRIC = "frost_shard_crypto_messages_total"
+
+
+def test_digest_is_deterministic() -> None:
+    """Check that the same message always produces the same digest."""
+    crypto = CryptoService(Fernet.generate_key().decode(), "index-key")
+
+    assert crypto.digest(b"test@user.com") == crypto.digest(b"test@user.com")
+    assert crypto.digest(b"test@user.com") != crypto.digest(b"other@user.com")
+    assert crypto.encrypt(b"test@user.com") != crypto.encrypt(b"test@user.com")
+
+
+def test_digest_depends_on_the_key() -> None:
+    """Check that digests depend on the index key, not the secrets."""
+    secret = Fernet.generate_key().decode()
+
+    first = CryptoService(secret, "index-key")
+    rotated = CryptoService(
+        Fernet.generate_key().decode(),
+        "index-key",
+        previous_secrets=[secret],
+    )
+    other_index_key = CryptoService(secret, "other-index-key")
+
+    assert first.digest(b"test@user.com") == rotated.digest(b"test@user.com")
+    assert first.digest(b"test@user.com") != other_index_key.digest(
+        b"test@user.com",
+    )
+
+
+def test_index_key_is_required() -> None:
+    """Check that the blind index is never computed without its own key."""
+    with pytest.raises(ValueError):
+        CryptoService(Fernet.generate_key().decode(), "")
+    with pytest.raises(ValidationError):
+        Settings(BLIND_INDEX_KEY="")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor_kind", ["thread", "process"])
+async def test_decrypt_many(executor_kind: str) -> None:
+    """Check that batch decryption keeps the order of the messages."""
+    messages = [f"test{number}@user.com".encode() for number in range(25)]
+    with create_executor(executor_kind, workers=2) as executor:
+        crypto = CryptoService(
+            Fernet.generate_key().decode(),
+            "index-key",
+            executor=executor,
+            chunk_size=4,
+            concurrency=2,
+        )
+        encrypted = [
+            msg
+            async for chunk in crypto.encrypt_many(messages)
+            for msg in chunk
+        ]
+        decrypted = [
+            msg
+            async for chunk in crypto.decrypt_many(encrypted)
+            for msg in chunk
+        ]
+
+    assert decrypted == messages
+    assert encrypted != messages
+
+
+@pytest.mark.asyncio
+async def test_decrypt_many_stops_early() -> None:
+    """Check that batch decryption doesn't go through all the chunks."""
+    crypto = CryptoService(
+        Fernet.generate_key().decode(),
+        "index-key",
+        chunk_size=2,
+        concurrency=2,
+    )
+    # Consuming the generator would fail on the first invalid message
+    messages = itertools.chain(
+        [crypto.encrypt(b"test@user.com")] * 4,
+        (pytest.fail("Over iterated") for _ in range(1)),
+    )
+
+    chunks = crypto.decrypt_many(messages)
+    first_chunk = await chunks.__anext__()
+    await chunks.aclose()
+
+    assert first_chunk == [b"test@user.com"] * 2
+
+
+@pytest.mark.asyncio
+async def test_decrypt_metrics() -> None:
+    """Check that both single and batch decryptions are counted."""
+    crypto = CryptoService(
+        Fernet.generate_key().decode(),
+        "index-key",
+        chunk_size=2,
+    )
+    messages = [crypto.encrypt(b"test@user.com")] * 5
+    labels = {"operation": "decrypt"}
+    before = REGISTRY.get_sample_value(MESSAGES_METRIC, labels) or 0
+
+    crypto.decrypt(messages[0])
+    async for _ in crypto.decrypt_many(messages):
+        pass
+
+    assert REGISTRY.get_sample_value(MESSAGES_METRIC, labels) == before + 6
+    assert REGISTRY.get_sample_value(
+        "frost_shard_crypto_seconds_count",
+        {"operation": "decrypt_chunk"},
+    )
@@ -0,0 +1,28 @@
+from frost_shard.database.instrumentation import (
+    describe_parameters,
+    normalize_statement,
+)
+
+
+def test_statement_fingerprints() -> None:
+    """Check that statements differing only in values share a fingerprint."""
+    first = normalize_statement(
+        "INSERT INTO files (email, date) VALUES (%s, %s), (%s, %s)",
+    )
+    second = normalize_statement(
+        "INSERT INTO files (email, date) VALUES (%s, %s)",
+    )
+    cast = normalize_statement("SELECT date_trunc(%s::VARCHAR, date) LIMIT 10")
+
+    assert first == second == "INSERT INTO files (email, date) VALUES (...)"
+    assert cast == "SELECT date_trunc(?::VARCHAR, date) LIMIT ?"
+
+
+def test_parameters_are_described_by_type() -> None:
+    """Check that only the types of the parameters are described."""
+    assert describe_parameters((b"secret", 1)) == ["bytes", "int"]
+    assert describe_parameters({"email": b"secret"}) == {"email": "bytes"}
+    assert describe_parameters([(b"secret",)] * 3, executemany=True) == {
+        "count": 3,
+        "first": ["bytes"],
+    }
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+from ratelimit import Rule
+
+from frost_shard.utils.rate_limit import SQLiteBackend
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeClock:
+    """Clock moving only when told to."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def test_token_bucket(tmp_path: Path) -> None:
+    """Check that tokens are taken and refilled over the rule period."""
+    clock = FakeClock()
+    backend = SQLiteBackend(str(tmp_path / "limits.db"), clock=clock)
+    rule = Rule(minute=2)
+
+    assert await backend.retry_after("/files", "user", rule) == 0
+    assert await backend.retry_after("/files", "user", rule) == 0
+    assert await backend.retry_after("/files", "user", rule) == 30
+    # Other users have buckets of their own
+    assert await backend.retry_after("/files", "other", rule) == 0
+
+    clock.now += 30
+    assert await backend.retry_after("/files", "user", rule) == 0
+    assert await backend.retry_after("/files", "user", rule) == 30
+
+
+async def test_buckets_are_shared(tmp_path: Path) -> None:
+    """Check that the backends of different workers share the buckets."""
+    clock = FakeClock()
+    path = str(tmp_path / "limits.db")
+    workers = [SQLiteBackend(path, clock=clock) for _ in range(2)]
+    rule = Rule(second=1)
+
+    assert await workers[0].retry_after("/files", "user", rule) == 0
+    assert await workers[1].retry_after("/files", "user", rule) == 1
+
+
+async def test_blocked_user(tmp_path: Path) -> None:
+    """Check that users going over the limit are blocked for a while."""
+    clock = FakeClock()
+    backend = SQLiteBackend(str(tmp_path / "limits.db"), clock=clock)
+    rule = Rule(second=1, block_time=10)
+
+    assert await backend.retry_after("/files", "user", rule) == 0
+    assert await backend.retry_after("/files", "user", rule) == 10
+
+    clock.now += 5
+    assert await backend.retry_after("/files", "user", rule) == 5
+
+
+async def test_expired_buckets_are_evicted(tmp_path: Path) -> None:
+    """Check that refilled buckets are removed from the database."""
+    clock = FakeClock()
+    backend = SQLiteBackend(str(tmp_path / "limits.db"), clock=clock)
+
+    for user in ("first", "second"):
+        await backend.retry_after("/files", user, Rule(second=1))
+    clock.now += backend.EVICTION_INTERVAL
+    await backend.retry_after("/files", "third", Rule(second=1))
+
+    (count,) = backend.connection.execute(
+        "SELECT count(*) FROM buckets",
+    ).fetchone()
+    assert count == 1
@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Sequence
+from unittest import mock
+
+import pytest
+
+from frost_shard.database.replicas import ReplicaPins, ReplicaRepository
+from frost_shard.settings import settings
+from frost_shard.v1.dependencies import get_file_service, get_replica_pins
+
+
+@dataclass
+class FakeEntry:
+    """Entry owned by someone."""
+
+    email_hash: bytes
+
+
+class FakeRepository:
+    """Keep the entries in memory and record the calls."""
+
+    def __init__(self) -> None:
+        self.entries: list[FakeEntry] = []
+        self.calls: list[str] = []
+
+    async def create(self, data: FakeEntry) -> FakeEntry:
+        self.calls.append("create")
+        self.entries.append(data)
+        return data
+
+    async def create_many(self, data: Sequence[FakeEntry]) -> list[FakeEntry]:
+        self.calls.append("create_many")
+        self.entries.extend(data)
+        return list(data)
+
+    async def collect(self, **filters: Any) -> list[FakeEntry]:
+        self.calls.append("collect")
+        return self.entries
+
+    async def stream(self, **filters: Any) -> AsyncIterator[FakeEntry]:
+        self.calls.append("stream")
+        for entry in self.entries:
+            yield entry
+
+
+@pytest.mark.asyncio
+async def test_replica_routing() -> None:
+    """Check that writes go to the primary and reads to the replica."""
+    primary, replica = FakeRepository(), FakeRepository()
+    repository = ReplicaRepository(primary, replica)  # type: ignore
+
+    await repository.create(FakeEntry(b"owner"))
+    await repository.create_many([FakeEntry(b"owner")])
+    await repository.collect(email_hash=b"owner")
+    _ = [entry async for entry in repository.stream(email_hash=b"owner")]
+
+    assert primary.calls == ["create", "create_many"]
+    assert replica.calls == ["collect", "stream"]
+
+
+def test_replica_pins() -> None:
+    """Check that only the unexpired pins created with the key are valid."""
+    now = 1000.0
+    pins = ReplicaPins(b"key", ttl=5, clock=lambda: now)
+    other_pins = ReplicaPins(b"other-key", ttl=5, clock=lambda: now)
+
+    pin = pins.create()
+    expires_at, _, signature = pin.partition(".")
+
+    assert pins.is_pinned(pin)
+    assert not pins.is_pinned(None)
+    assert not pins.is_pinned(other_pins.create())
+    assert not pins.is_pinned(f"{int(expires_at) + 60}.{signature}")
+    assert not pins.is_pinned("invalid")
+    now += 5
+    assert not pins.is_pinned(pin)
+
+
+def test_pinned_clients_read_from_primary(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Check that the replica is skipped for the clients with a pin."""
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", ["replica"])
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 5)
+    get_replica_pins.cache_clear()
+    pins = get_replica_pins()
+    assert pins is not None
+
+    sessions: dict = {"session": mock.Mock(), "replica_session": mock.Mock()}
+    pinned = get_file_service(
+        **sessions,
+        crypto_service=mock.Mock(),
+        replica_pin=pins.create(),
+    )
+    not_pinned = get_file_service(
+        **sessions,
+        crypto_service=mock.Mock(),
+        replica_pin=None,
+    )
+    get_replica_pins.cache_clear()
+
+    assert not isinstance(pinned.repository, ReplicaRepository)
+    assert isinstance(not_pinned.repository, ReplicaRepository)
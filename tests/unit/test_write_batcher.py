@@ -0,0 +1,99 @@
+import asyncio
+from itertools import islice
+from typing import Sequence
+
+import pytest
+
+from frost_shard.database.batching import WriteBatcher
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeCreateMany:
+    """Record the batches and create entries by upper casing them."""
+
+    def __init__(
+        self,
+        error: Exception | None = None,
+        skip: int = 0,
+    ) -> None:
+        self.batches: list[list[str]] = []
+        self.error = error
+        self.skip = skip
+
+    async def __call__(self, data: Sequence[str]) -> list[str]:
+        self.batches.append(list(data))
+        if self.error is not None:
+            raise self.error
+        return [entry.upper() for entry in islice(data, self.skip, None)]
+
+
+async def test_batcher_coalesces_concurrent_creates() -> None:
+    """Check that concurrent creates are written in a single batch."""
+    create_many = FakeCreateMany()
+    batcher = WriteBatcher(create_many, max_delay=0.01, max_size=10)
+
+    entries = await asyncio.gather(
+        *(batcher.create(letter) for letter in "abcde"),
+    )
+
+    assert entries == list("ABCDE")
+    assert create_many.batches == [list("abcde")]
+
+
+async def test_batcher_flushes_full_batches() -> None:
+    """Check that batches are written right away once they are full."""
+    create_many = FakeCreateMany()
+    batcher = WriteBatcher(create_many, max_delay=60, max_size=2)
+
+    entries = await asyncio.wait_for(
+        asyncio.gather(*(batcher.create(letter) for letter in "abcd")),
+        timeout=1,
+    )
+
+    assert entries == list("ABCD")
+    assert create_many.batches == [list("ab"), list("cd")]
+
+
+async def test_batcher_fails_all_callers() -> None:
+    """Check that every caller gets the error of the failed batch."""
+    batcher = WriteBatcher(
+        FakeCreateMany(error=RuntimeError("Failed")),
+        max_delay=0.01,
+        max_size=10,
+    )
+
+    results = await asyncio.gather(
+        *(batcher.create(letter) for letter in "ab"),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_batcher_fails_all_callers_on_missing_entries() -> None:
+    """Check that entries are never handed to the wrong callers."""
+    batcher = WriteBatcher(
+        FakeCreateMany(skip=1),
+        max_delay=0.01,
+        max_size=10,
+    )
+
+    results = await asyncio.gather(
+        *(batcher.create(letter) for letter in "abc"),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_batcher_close_writes_pending_entries() -> None:
+    """Check that closing the batcher doesn't wait for the delay."""
+    create_many = FakeCreateMany()
+    batcher = WriteBatcher(create_many, max_delay=60, max_size=10)
+
+    pending = asyncio.create_task(batcher.create("a"))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(batcher.close(), timeout=1)
+
+    assert await pending == "A"